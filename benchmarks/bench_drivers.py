@@ -0,0 +1,232 @@
+"""
+Benchmark do custo de barramento e da latência dos drivers, sem hardware.
+
+Roda cada método público contra o barramento simulado (sensores.simulacao) com
+um relógio virtual: ``time.sleep`` avança o relógio em vez de dormir, e cada
+transação I2C avança o relógio pelo tempo que levaria no fio. Assim a latência
+medida é a que o laço teria na placa, e os números são determinísticos.
+
+Para cada caso são reportados, por chamada:
+    transacoes, bytes   -> tráfego I2C
+    barramento_ms       -> tempo no fio (clock do barramento simulado)
+    sono_ms             -> tempo gasto em time.sleep
+    latencia_ms         -> p50/p90/p99/máx da latência virtual (barramento + sono)
+    cpu_us              -> p50/p90 do tempo real de CPU do Python (não comparado)
+
+Uso:
+    python benchmarks/bench_drivers.py                      # só mostra
+    python benchmarks/bench_drivers.py --salvar             # grava a baseline
+    python benchmarks/bench_drivers.py --comparar           # falha se piorar
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import importlib.util
+import numpy as np
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from sensores import TCS34725, VL53L0X, PCA9685, MG90S, Porta
+from sensores.mg90s import mover_servos
+from sensores.escalonador import Escalonador
+from sensores.i2cmodule import definir_backend
+from sensores.simulacao import (BarramentoSimulado, TCS34725Simulado,
+                                VL53L0XSimulado, PCA9685Simulado, RelogioVirtual)
+
+BASELINE_PADRAO = os.path.join(RAIZ, "benchmarks", "baseline.json")
+CLOCK_PADRAO = 100_000
+
+# Métricas determinísticas comparadas com a baseline
+METRICAS_COMPARADAS = ("transacoes", "bytes", "barramento_ms", "sono_ms", "latencia_p50_ms", "latencia_max_ms")
+
+
+class BarramentoCronometrado(BarramentoSimulado):
+    """Barramento simulado que avança o relógio virtual a cada transação"""
+
+    def __init__(self, relogio, clock_hz):
+        super().__init__(clock_hz=clock_hz)
+        self.relogio = relogio
+
+    def _contabilizar(self, endereco, mensagens, nbytes):
+        antes = self.tempo_barramento
+        super()._contabilizar(endereco, mensagens, nbytes)
+        self.relogio.agora += self.tempo_barramento - antes
+
+
+def montar_bancada(relogio, clock_hz):
+    """Barramento com um dispositivo de cada tipo, nos canais usados pelos exemplos"""
+    sim = BarramentoCronometrado(relogio, clock_hz)
+    sim.conectar(TCS34725Simulado(cor=(300, 250, 200, 800)), canal=Porta.I2C2)
+    for canal in (Porta.I2C1, Porta.I2C3, Porta.I2C4, Porta.I2C5):
+        sim.conectar(VL53L0XSimulado(distancia=120), canal=canal)
+    sim.conectar(PCA9685Simulado(), canal=5)
+    definir_backend(lambda numero: sim)
+    return sim
+
+
+def medir(nome, sim, relogio, funcao, repeticoes):
+    """Executa funcao(i) `repeticoes` vezes e resume o custo por chamada"""
+    latencias = np.empty(repeticoes)
+    cpu = np.empty(repeticoes)
+    sim.zerar_estatisticas()
+    relogio.sono = 0.0
+    for i in range(repeticoes):
+        inicio_virtual = relogio.agora
+        inicio_cpu = time.perf_counter()
+        funcao(i)
+        cpu[i] = time.perf_counter() - inicio_cpu
+        latencias[i] = relogio.agora - inicio_virtual
+    p50, p90, p99 = np.percentile(latencias, (50, 90, 99)) * 1000
+    return {
+        "caso": nome,
+        "transacoes": sim.transacoes / repeticoes,
+        "bytes": sim.bytes / repeticoes,
+        "barramento_ms": sim.tempo_barramento * 1000 / repeticoes,
+        "sono_ms": relogio.sono * 1000 / repeticoes,
+        "latencia_p50_ms": p50,
+        "latencia_p90_ms": p90,
+        "latencia_p99_ms": p99,
+        "latencia_max_ms": latencias.max() * 1000,
+        "cpu_p50_us": np.percentile(cpu, 50) * 1e6,
+        "cpu_p90_us": np.percentile(cpu, 90) * 1e6,
+    }
+
+
+def carregar_pegar_objeto():
+    """Importa pegarObjeto de exemplo/garraSensorCor.py (o exemplo não é um pacote)"""
+    caminho = os.path.join(RAIZ, "exemplo", "garraSensorCor.py")
+    spec = importlib.util.spec_from_file_location("garraSensorCor", caminho)
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo.pegarObjeto
+
+
+def executar(repeticoes=200, clock_hz=CLOCK_PADRAO):
+    """Roda todos os casos e retorna a lista de resultados"""
+    resultados = []
+    with RelogioVirtual() as relogio:
+        sim = montar_bancada(relogio, clock_hz)
+        try:
+            cor = TCS34725(canal_mux=Porta.I2C2)
+            cor.valores_min, cor.valores_max = (10, 10, 10, 40), (900, 900, 900, 2800)
+            distancia = VL53L0X(canal_mux=Porta.I2C1)
+            pca = PCA9685(mux_channel=5)
+            servo = MG90S(pca, channel=0)
+            servos = [servo] + [MG90S(pca, channel=c) for c in (4, 12)]
+            relogio.sleep(0.05)     # Primeira integração do TCS34725
+
+            def intervalo(funcao):
+                # Uma leitura por ciclo de integração, como no uso real
+                def caso(i):
+                    relogio.sleep(cor.periodo_amostragem())
+                    return funcao()
+                return caso
+
+            casos = [
+                ("TCS34725.ler_cores", intervalo(cor.ler_cores)),
+                ("TCS34725.nome_cor", intervalo(cor.nome_cor)),
+                ("VL53L0X.ler_distancia", lambda i: distancia.ler_distancia()),
+                ("PCA9685.set_pwm_duty_cycle", lambda i: pca.set_pwm_duty_cycle(1, (i % 100) / 1000)),
+                ("MG90S.set_angle", lambda i: servo.set_angle((i * 37) % 181)),
+                ("mover_servos(3)", lambda i: mover_servos({s: (i * 37 + 60 * k) % 181
+                                                            for k, s in enumerate(servos)})),
+            ]
+            for nome, funcao in casos:
+                resultados.append(medir(nome, sim, relogio, funcao, repeticoes))
+
+            distancias = [distancia] + [VL53L0X(canal_mux=c) for c in (Porta.I2C3, Porta.I2C4, Porta.I2C5)]
+            resultados.append(medir("4x VL53L0X.ler_distancia", sim, relogio,
+                                    lambda i: [d.ler_distancia() for d in distancias], repeticoes))
+            escalonador = Escalonador(distancias + [cor])
+            resultados.append(medir("Escalonador.rodada (4x VL53L0X + TCS34725)", sim, relogio,
+                                    lambda i: escalonador.rodada(), repeticoes))
+
+            distancia.iniciar_continuo()
+            resultados.append(medir("VL53L0X.ler_distancia (contínuo)", sim, relogio,
+                                    lambda i: distancia.ler_distancia(), repeticoes))
+            distancia.parar_continuo()
+
+            pegar_objeto = carregar_pegar_objeto()
+            saida = sys.stdout
+            sys.stdout = open(os.devnull, "w")      # pegarObjeto imprime cada ângulo
+            try:
+                resultados.append(medir("pegarObjeto", sim, relogio,
+                                        lambda i: pegar_objeto((80, 130, 180)[i % 3]),
+                                        max(1, repeticoes // 20)))
+            finally:
+                sys.stdout.close()
+                sys.stdout = saida
+        finally:
+            definir_backend(None)
+    return resultados
+
+
+def imprimir(resultados):
+    print(f"{'caso':44} {'trans':>7} {'bytes':>8} {'fio ms':>8} {'sono ms':>9} "
+          f"{'p50 ms':>9} {'p99 ms':>9} {'cpu us':>8}")
+    for r in resultados:
+        print(f"{r['caso']:44} {r['transacoes']:7.1f} {r['bytes']:8.1f} {r['barramento_ms']:8.3f} "
+              f"{r['sono_ms']:9.3f} {r['latencia_p50_ms']:9.3f} {r['latencia_p99_ms']:9.3f} "
+              f"{r['cpu_p50_us']:8.1f}")
+
+
+def comparar(resultados, baseline, tolerancia):
+    """Retorna a lista de regressões (métricas acima da baseline + tolerância relativa)"""
+    anteriores = {r["caso"]: r for r in baseline["resultados"]}
+    regressoes = []
+    for r in resultados:
+        anterior = anteriores.get(r["caso"])
+        if anterior is None:
+            continue
+        for metrica in METRICAS_COMPARADAS:
+            limite = anterior[metrica] * (1 + tolerancia) + 1e-9
+            if r[metrica] > limite:
+                regressoes.append(f"{r['caso']}: {metrica} {anterior[metrica]:.3f} -> {r[metrica]:.3f}")
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos drivers no barramento simulado")
+    parser.add_argument("--repeticoes", type=int, default=200)
+    parser.add_argument("--clock", type=int, default=CLOCK_PADRAO, help="Clock I2C em Hz")
+    parser.add_argument("--baseline", default=BASELINE_PADRAO)
+    parser.add_argument("--salvar", action="store_true", help="Grava os resultados como baseline")
+    parser.add_argument("--comparar", action="store_true", help="Falha se alguma métrica piorar")
+    parser.add_argument("--tolerancia", type=float, default=0.01, help="Piora relativa aceita")
+    args = parser.parse_args()
+
+    if args.comparar:
+        with open(args.baseline) as arquivo:
+            baseline = json.load(arquivo)
+        # Médias por chamada só são comparáveis nas mesmas condições: com menos
+        # repetições, o custo da primeira chamada pesa mais em cada média
+        if baseline["clock_hz"] != args.clock:
+            sys.exit(f"Baseline medida a {baseline['clock_hz']} Hz, não {args.clock} Hz.")
+        if baseline["repeticoes"] != args.repeticoes:
+            sys.exit(f"Baseline medida com {baseline['repeticoes']} repetições, não {args.repeticoes}; "
+                     f"use --repeticoes {baseline['repeticoes']} ou salve outra baseline.")
+
+    resultados = executar(args.repeticoes, args.clock)
+    imprimir(resultados)
+
+    if args.salvar:
+        with open(args.baseline, "w") as arquivo:
+            json.dump({"clock_hz": args.clock, "repeticoes": args.repeticoes,
+                       "resultados": resultados}, arquivo, indent=2, ensure_ascii=False)
+        print(f"\nBaseline salva em {args.baseline}")
+
+    if args.comparar:
+        regressoes = comparar(resultados, baseline, args.tolerancia)
+        if regressoes:
+            print("\nRegressões em relação à baseline:")
+            for regressao in regressoes:
+                print(f"  {regressao}")
+            sys.exit(1)
+        print("\nSem regressões em relação à baseline.")
+
+
+if __name__ == "__main__":
+    main()
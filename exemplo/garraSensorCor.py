@@ -1,61 +1,82 @@
 from sensores import PCA9685, MG90S, TCS34725
+from sensores.movimento import SequenciaMovimento
+from sensores.pipeline import PipelineSeparacao
 import time
 
-def pegarObjeto(initial_angle):
-    pca = PCA9685(mux_channel=5)
+_servos = None
+_movimentos = {}    # Ângulo inicial -> movimento já compilado
+
 
-    servo1 = MG90S(pca, channel=0)    
+def criarServos(pca):
+    # Base, braço e garra; as mesmas instâncias para todos os movimentos, para
+    # que cada servo saiba a posição em que o movimento anterior o deixou
+    return MG90S(pca, channel=0), MG90S(pca, channel=4), MG90S(pca, channel=12)
 
-    servo1.set_angle(initial_angle) 
 
-    #tudo reto
-    servo2 = MG90S(pca, channel=4)
-    servo2.set_angle(50)
+def compilarPegarObjeto(servos, initial_angle):
+    servo1, servo2, servo4 = servos     # Base, braço e garra
 
-    servo4 = MG90S(pca, channel=12)
-    # abrir
-    servo4.set_angle(0)
+    # tudo reto, garra aberta, base virada para o objeto
+    sequencia = SequenciaMovimento({servo1: initial_angle, servo2: 50, servo4: 0})
+
+    # abaixar (até 105°, o último passo do antigo laço de 5 em 5 graus)
+    sequencia.mover({servo2: 105})
 
-    # abaixar 
-    print("Movendo o servo2 de 0° a 180°...")
-    for angle in range(50, 110, 5):
-        print(f"Ângulo: {angle}°")
-        servo2.set_angle(angle)
-        #time.sleep(0.1)
-    
     #fechar
-    servo4.set_angle(25)
+    sequencia.mover({servo4: 25})
 
     #subir
-    servo2.set_angle(50)
+    sequencia.mover({servo2: 50})
 
-    #direcao deposito
-    for angle in range(initial_angle, 0, -7):
-        servo1.set_angle(angle)
+    #direcao deposito (mesmo ângulo final do antigo laço de 7 em 7 graus)
+    sequencia.mover({servo1: initial_angle % 7 or 7})
 
     #abrir
-    servo4.set_angle(0)
+    sequencia.mover({servo4: 0})
+    return sequencia.compilar()
+
+
+def pegarObjeto(initial_angle, servos=None):
+    global _servos
+    if servos is not None and servos is not _servos:
+        _servos = servos
+        _movimentos.clear()
+    if _servos is None:
+        _servos = criarServos(PCA9685(mux_channel=5))
+    movimento = _movimentos.get(initial_angle)
+    if movimento is None:
+        movimento = _movimentos[initial_angle] = compilarPegarObjeto(_servos, initial_angle)
+    print(f"Pegando objeto a {initial_angle}°: {len(movimento.tabela)} quadros")
+    movimento.executar()
+
+
+ANGULOS_CORES = {'Vermelho': 180, 'Verde': 130, 'Azul': 80}
+
 
-    
 if __name__ == "__main__":
-    # Inicializa PCA9685 no canal 0 do multiplexador
+    # Drivers criados uma vez e reaproveitados a cada objeto
     pca = PCA9685(mux_channel=5)
+    sensor = TCS34725(canal_mux=1)
+    servos = criarServos(pca)
+    base = servos[0]
 
-    while(True):
-        print('Coloque o objeto para leitura e pressione enter.')        
+    def detectar():
+        print('Coloque o objeto para leitura e pressione enter.')
         input()
+        return sensor.ler_cores()           # Leitura feita com o objeto no lugar
 
-        cor = TCS34725(canal_mux=1).nome_cor()
+    def atuar(cor):
         print(cor)
-        
-        if cor == 'Vermelho':
-            pegarObjeto(180)
-        elif cor == 'Verde':
-            pegarObjeto(130)
-        elif cor == 'Azul':
-            pegarObjeto(80)
+        if cor in ANGULOS_CORES:
+            pegarObjeto(ANGULOS_CORES[cor], servos)
         else:
             print('Cor invalida')
-            input()
+        base.set_angle(130)
 
-        MG90S(pca, 0).set_angle(130) 
+    # O próximo objeto é lido e classificado enquanto o braço move o anterior
+    pipeline = PipelineSeparacao(detectar, sensor.nome_cor, atuar)
+    try:
+        pipeline.executar()
+    except KeyboardInterrupt:
+        pass
+    print(pipeline.relatorio())
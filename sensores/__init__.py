@@ -1,19 +1,45 @@
 # sensores/__init__.py
-from .tcs34725 import TCS34725
-from .vl53l0x import VL53L0X
-from .mg90s import MG90S
-from .pca9685 import PCA9685
-from .botoes import Botao
-from .portas import Porta
-from .i2cmodule import I2CModule
+#
+# Os drivers são importados sob demanda (PEP 562): ``import sensores`` não carrega
+# gpiod, smbus2 nem NumPy, e um script que só usa o PCA9685 não depende do gpiod.
+import importlib
+from typing import TYPE_CHECKING
 
-__all__ = [
-    "TCS34725",
-    "VL53L0X",
-    "MG90S",
-    "PCA9685",
-    "Botao",
-    "Porta",
-    "I2CModule",
-]
+# Nome exportado -> módulo onde ele é definido
+_MODULOS = {
+    "TCS34725": ".tcs34725",
+    "VL53L0X": ".vl53l0x",
+    "MG90S": ".mg90s",
+    "PCA9685": ".pca9685",
+    "Botao": ".botoes",
+    "Porta": ".portas",
+    "I2CModule": ".i2cmodule",
+    "Amostrador": ".amostragem",
+    "BufferCircular": ".amostragem",
+}
 
+__all__ = list(_MODULOS)
+
+if TYPE_CHECKING:
+    from .tcs34725 import TCS34725
+    from .vl53l0x import VL53L0X
+    from .mg90s import MG90S
+    from .pca9685 import PCA9685
+    from .botoes import Botao
+    from .portas import Porta
+    from .i2cmodule import I2CModule
+    from .amostragem import Amostrador, BufferCircular
+
+
+def __getattr__(nome):
+    """Importa o driver no primeiro acesso e guarda no módulo para os próximos"""
+    modulo = _MODULOS.get(nome)
+    if modulo is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
+    valor = getattr(importlib.import_module(modulo, __name__), nome)
+    globals()[nome] = valor
+    return valor
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
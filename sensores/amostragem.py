@@ -0,0 +1,162 @@
+import threading
+import time
+import numpy as np
+
+
+class BufferCircular:
+    """
+    Buffer circular de tamanho fixo para séries temporais de sensores.
+
+    Os dados ficam em arrays NumPy alocados uma única vez: ``dados`` tem uma linha
+    por amostra e ``tempos`` guarda o instante (``time.monotonic``) de cada uma.
+    ``total`` conta quantas amostras já foram escritas desde o início e serve de
+    índice absoluto para os consumidores. Há um único produtor; leitores recebem
+    visões (sem cópia) que continuam válidas até o produtor dar a volta no buffer.
+
+    Args:
+        capacidade (int): Número máximo de amostras guardadas
+        canais (int): Valores por amostra (ex.: 4 para R, G, B, C)
+        dtype: Tipo NumPy dos valores
+    """
+
+    def __init__(self, capacidade, canais, dtype=np.uint16):
+        self.capacidade = capacidade
+        self.dados = np.zeros((capacidade, canais), dtype=dtype)
+        self.tempos = np.zeros(capacidade, dtype=np.float64)
+        self.total = 0
+
+    def linha_escrita(self):
+        """Visão da linha onde a próxima amostra deve ser escrita"""
+        return self.dados[self.total % self.capacidade]
+
+    def confirmar(self, tempo):
+        """Registra o instante da amostra escrita em linha_escrita() e a publica"""
+        self.tempos[self.total % self.capacidade] = tempo
+        self.total += 1
+
+    def mais_antiga(self):
+        """Índice absoluto da amostra mais antiga ainda disponível"""
+        return max(0, self.total - self.capacidade)
+
+    def fatia(self, inicio, fim):
+        """
+        Retorna (tempos, dados) das amostras absolutas [inicio, fim) como visões
+        Se o intervalo cruzar o fim do buffer, retorna apenas a parte contígua.
+        """
+        inicio = max(inicio, self.mais_antiga())
+        i = inicio % self.capacidade
+        n = max(0, min(fim - inicio, self.capacidade - i))
+        return self.tempos[i:i + n], self.dados[i:i + n]
+
+    def ultimas(self, n):
+        """
+        Retorna as últimas n amostras como lista de até dois pares (tempos, dados)
+        """
+        fim = self.total
+        inicio = max(fim - n, self.mais_antiga())
+        segmentos = []
+        while inicio < fim:
+            tempos, dados = self.fatia(inicio, fim)
+            segmentos.append((tempos, dados))
+            inicio += len(tempos)
+        return segmentos
+
+
+class Amostrador:
+    """
+    Lê um sensor I2C continuamente no ritmo natural dele e grava em um BufferCircular.
+
+    O período padrão vem de ``sensor.periodo_amostragem()`` (tempo de integração do
+    TCS34725 ou período de medição do VL53L0X). A leitura roda em uma thread
+    própria; os consumidores usam ``lotes()`` ou ``buffer.ultimas()`` sem atrasar
+    a aquisição.
+
+    Args:
+        sensor (I2CModule): Sensor com suporte a amostragem (TCS34725, VL53L0X)
+        capacidade (int): Tamanho do buffer circular em amostras
+        periodo (float): Intervalo entre leituras em segundos (padrão: o do sensor)
+
+    Example:
+        >>> sensor = TCS34725(canal_mux=1)
+        >>> with Amostrador(sensor, capacidade=4096) as amostrador:
+        ...     for tempos, dados in amostrador.lotes(64):
+        ...         print(tempos[-1], dados.mean(axis=0))
+    """
+
+    def __init__(self, sensor, capacidade=1024, periodo=None):
+        if sensor.CANAIS_AMOSTRA is None:
+            raise TypeError(f"{type(sensor).__name__} não suporta amostragem contínua.")
+        self.sensor = sensor
+        self.periodo = periodo if periodo is not None else sensor.periodo_amostragem()
+        self.buffer = BufferCircular(capacidade, sensor.CANAIS_AMOSTRA, sensor.TIPO_AMOSTRA)
+        self.perdidas = 0               # Amostras sobrescritas antes de serem consumidas
+        self._condicao = threading.Condition()
+        self._parar = threading.Event()
+        self._thread = None
+
+    def iniciar(self):
+        """Inicia a thread de aquisição"""
+        if self._thread is not None:
+            return
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._executar, name="Amostrador", daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        """Para a aquisição e acorda os consumidores que estiverem esperando"""
+        if self._thread is None:
+            return
+        self._parar.set()
+        with self._condicao:
+            self._condicao.notify_all()
+        self._thread.join()
+        self._thread = None
+
+    @property
+    def ativo(self):
+        return self._thread is not None and not self._parar.is_set()
+
+    def __enter__(self):
+        self.iniciar()
+        return self
+
+    def __exit__(self, *exc):
+        self.parar()
+
+    def _executar(self):
+        """Laço de aquisição: uma leitura por período, em instantes fixos"""
+        buffer = self.buffer
+        proximo = time.monotonic()
+        while not self._parar.is_set():
+            espera = proximo - time.monotonic()
+            if espera > 0 and self._parar.wait(espera):
+                break
+            self.sensor._ler_amostra(buffer.linha_escrita())
+            agora = time.monotonic()
+            buffer.confirmar(agora)
+            with self._condicao:
+                self._condicao.notify_all()
+            # Mantém a cadência; se atrasou mais de um período, não tenta recuperar
+            proximo = max(proximo + self.periodo, agora)
+
+    def lotes(self, tamanho, timeout=None):
+        """
+        Gerador de lotes (tempos, dados) com até `tamanho` amostras novas cada
+        Os arrays são visões do buffer (sem cópia) e devem ser processados antes
+        que o produtor dê a volta nele. Termina quando o amostrador para ou quando
+        passar `timeout` segundos sem um lote completo.
+        """
+        indice = self.buffer.total
+        while True:
+            with self._condicao:
+                pronto = self._condicao.wait_for(
+                    lambda: self.buffer.total - indice >= tamanho or not self.ativo, timeout)
+            total = self.buffer.total
+            if total == indice or (not pronto and timeout is not None):
+                return
+            if indice < self.buffer.mais_antiga():
+                self.perdidas += self.buffer.mais_antiga() - indice
+                indice = self.buffer.mais_antiga()
+            tempos, dados = self.buffer.fatia(indice, min(total, indice + tamanho))
+            indice += len(tempos)
+            yield tempos, dados
@@ -1,33 +1,64 @@
-import time
-import gpiod
-from gpiod.line import Direction, Value
-from sensores.portas import Porta  
+import asyncio
+import threading
+from collections import deque, namedtuple
+from datetime import timedelta
+from sensores.portas import Porta
+
+DEBOUNCE_PADRAO_MS = 10     # Debounce aplicado pelo kernel em cada linha
+
+# Evento de borda de um botão: porta, True se foi pressionado e instante (CLOCK_MONOTONIC, ns)
+EventoBotao = namedtuple("EventoBotao", ["porta", "apertado", "timestamp_ns"])
 
 class Botao:
     """
     Classe para gerenciar botões conectados na Banana Pi M4 Zero via GPIO
     Cada botão retorna apenas dois estados: pressionado (0) ou liberado (1)
+    Todas as portas ficam em uma única requisição de linhas, com detecção de
+    bordas e debounce feitos pelo kernel.
     """
 
-    def __init__(self, portas):
+    def __init__(self, portas, debounce_ms=DEBOUNCE_PADRAO_MS, gpio=None):
         """
         Inicializa o driver dos botões para as portas desejadas
-        portas: tupla ou lista com as portas a serem utilizadas 
+        portas: tupla ou lista com as portas a serem utilizadas
+        debounce_ms: período de debounce do kernel em milissegundos
+        gpio: backend com a interface de gpiod (Chip, request_lines, LineSettings,
+              EdgeEvent e line); None usa o gpiod real, importado só nesse caso;
+              sensores.simulacao.GPIOSimulado() permite rodar sem a placa e sem libgpiod
         """
+        if gpio is None:
+            import gpiod
+            gpio = gpiod
+        self._gpio = gpio
+        linha = gpio.line       # Direction, Edge e Value do backend
         self.chip_name = "/dev/gpiochip0"
-        self.chip = gpiod.Chip(self.chip_name)
+        self.chip = self._gpio.Chip(self.chip_name)
+        self.portas = tuple(portas)
 
-        # Cria um dicionário para armazenar os objetos de cada botão
-        self.botoes = {}
-        for p in portas:
-            self.botoes[p] = gpiod.request_lines(
-                self.chip_name,
-                config={p: gpiod.LineSettings(direction=Direction.INPUT)}
-            )
+        # Uma única requisição para todas as portas, com eventos nas duas bordas
+        self.requisicao = self._gpio.request_lines(
+            self.chip_name,
+            consumer="sensores.Botao",
+            config={self.portas: gpio.LineSettings(
+                direction=linha.Direction.INPUT,
+                edge_detection=linha.Edge.BOTH,
+                debounce_period=timedelta(milliseconds=debounce_ms),
+            )}
+        )
+
+        # Mantém o dicionário porta -> requisição usado pelas versões anteriores
+        self.botoes = dict.fromkeys(self.portas, self.requisicao)
 
         # Estados lógicos do botão
-        self.LIBERADO = Value.ACTIVE
-        self.APERTADO = Value.INACTIVE
+        self.LIBERADO = linha.Value.ACTIVE
+        self.APERTADO = linha.Value.INACTIVE
+        self._DESCIDA = gpio.EdgeEvent.Type.FALLING_EDGE
+
+        # Entrega de eventos por callback (thread criada sob demanda)
+        self._callbacks = []
+        self._thread = None
+        self._parar = threading.Event()
+        self._pendentes = deque()      # Eventos lidos mas ainda não entregues pela API assíncrona
 
     def ler_estado(self, porta):
         """
@@ -36,22 +67,103 @@ class Botao:
         if porta not in self.botoes:
             raise ValueError(f"Porta {porta} não foi inicializada.")
 
-        # linha = self.PINOS[porta]
-        estado = self.botoes[porta].get_value(porta)
+        estado = self.requisicao.get_value(porta)
         return estado == self.APERTADO  # True se pressionado, False se liberado
 
+    def ler_estados(self):
+        """
+        Lê todas as portas em uma única chamada e retorna {porta: pressionado}
+        """
+        valores = self.requisicao.get_values(self.portas)
+        return {p: v == self.APERTADO for p, v in zip(self.portas, valores)}
+
+    # ----- EVENTOS -----
+    def _converter(self, evento):
+        """Converte um gpiod.EdgeEvent em EventoBotao"""
+        apertado = evento.event_type == self._DESCIDA
+        return EventoBotao(evento.line_offset, apertado, evento.timestamp_ns)
+
+    def ler_eventos(self, timeout=0):
+        """
+        Retorna a lista de eventos pendentes, esperando até timeout segundos
+        (None espera indefinidamente). Lista vazia se nada acontecer.
+        """
+        if not self.requisicao.wait_edge_events(timeout):
+            return []
+        return [self._converter(e) for e in self.requisicao.read_edge_events()]
+
+    def eventos(self, timeout=None):
+        """
+        Iterador bloqueante de eventos
+        Termina quando passar timeout segundos sem nenhum evento (None = nunca).
+        """
+        while True:
+            pendentes = self.ler_eventos(timeout)
+            if not pendentes:
+                return
+            yield from pendentes
+
+    def ao_evento(self, callback):
+        """
+        Registra uma função chamada como callback(evento) a cada evento
+        Os eventos passam a ser consumidos por uma thread interna, então não
+        misture callbacks com eventos() ou eventos_async().
+        """
+        self._callbacks.append(callback)
+        if self._thread is None:
+            self._parar.clear()
+            self._thread = threading.Thread(target=self._despachar, name="Botao-eventos", daemon=True)
+            self._thread.start()
+
+    def _despachar(self):
+        """Laço da thread de callbacks"""
+        while not self._parar.is_set():
+            for evento in self.ler_eventos(timeout=0.1):
+                for callback in list(self._callbacks):
+                    callback(evento)
+
+    async def proximo_evento(self):
+        """
+        Espera (de forma assíncrona) e retorna o próximo evento
+        Usa o descritor da requisição no laço do asyncio, sem threads nem polling.
+        """
+        while not self._pendentes:
+            loop = asyncio.get_running_loop()
+            pronto = loop.create_future()
+            loop.add_reader(self.requisicao.fd, lambda: pronto.done() or pronto.set_result(None))
+            try:
+                await pronto
+            finally:
+                loop.remove_reader(self.requisicao.fd)
+            self._pendentes.extend(self.ler_eventos())
+        return self._pendentes.popleft()
+
+    async def eventos_async(self):
+        """Gerador assíncrono de eventos: async for evento in botao.eventos_async()"""
+        while True:
+            yield await self.proximo_evento()
+
+    def close(self):
+        """Para a thread de callbacks e libera as linhas GPIO"""
+        if self._thread is not None:
+            self._parar.set()
+            self._thread.join()
+            self._thread = None
+        self.requisicao.release()
+        self.chip.close()
+
 # ===== TESTE =====
 if __name__ == "__main__":
     botoes = Botao(portas=(Porta.P2, Porta.P4))  # Inicializa dois botões (P2 e P4)
 
     print("Pressione Ctrl+C para sair.")
     try:
-        while True:
-            estado_p2 = "PRESSIONADO" if botoes.ler_estado(Porta.P2) else "LIBERADO"
-            estado_p4 = "PRESSIONADO" if botoes.ler_estado(Porta.P4) else "LIBERADO"
-
-            print(f"[P2] {estado_p2} | [P4] {estado_p4}")
-            time.sleep(0.1)
+        for evento in botoes.eventos():
+            porta = "P2" if evento.porta == Porta.P2 else "P4"
+            estado = "PRESSIONADO" if evento.apertado else "LIBERADO"
+            print(f"[{porta}] {estado} ({evento.timestamp_ns / 1e9:.3f} s)")
 
     except KeyboardInterrupt:
         print("\nEncerrando leitura dos botões.")
+    finally:
+        botoes.close()
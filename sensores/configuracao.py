@@ -1,16 +1,50 @@
+import os
 import pickle
+import tempfile
+import threading
+from contextlib import contextmanager
+
+
+class _EstadoLote:
+    """Lote em andamento sobre um arquivo: compartilhado, como o dicionário, por caminho"""
+
+    __slots__ = ("nivel", "pendente", "alteracoes")
+
+    def __init__(self):
+        self.nivel = 0              # Blocos lote() abertos sobre o arquivo
+        self.pendente = False       # Alterações ainda não gravadas
+        self.alteracoes = 0         # Contador de alterações no arquivo (de qualquer instância)
+
+
+_AUSENTE = object()     # Chave que não existia antes do bloco
+
+
+class _Bloco:
+    """Um bloco lote() aberto: valores anteriores das chaves alteradas nele"""
+
+    __slots__ = ("anteriores", "alteracoes")
+
+    def __init__(self):
+        self.anteriores = {}        # chave -> valor antes do bloco (ou _AUSENTE)
+        self.alteracoes = 0         # Alterações feitas por esta instância durante o bloco
+
 
 class Configuracao:
     """
     Sistema de configuração persistente para salvar e carregar dados entre execuções.
-    
+
     Esta classe permite salvar configurações em arquivos pickle que persistem
     entre diferentes execuções do programa. Útil para calibrações de sensores,
     configurações de usuário e outros dados que devem ser mantidos.
-    
+
+    As configurações ficam em um dicionário compartilhado por todas as instâncias
+    que abrem o mesmo arquivo no processo, e cada gravação é atômica (arquivo
+    temporário + rename), então uma queda de energia durante o salvamento não
+    corrompe o arquivo anterior.
+
     Args:
         nomeArquivo (str): Nome do arquivo de configuração (sem extensão)
-        
+
     Example:
         >>> config = Configuracao("minha_config")
         >>> config.insere("nome", "Gabriel")
@@ -19,62 +53,101 @@ class Configuracao:
         >>> print(nome)
         Gabriel
     """
-    
+
+    _cache = {}                     # caminho absoluto -> dicionário compartilhado
+    _lotes = {}                     # caminho absoluto -> _EstadoLote compartilhado
+    _lock = threading.RLock()
+
     def __init__(self, nomeArquivo):
         """
         Inicializa o sistema de configuração.
-        
+
         Args:
             nomeArquivo (str): Nome do arquivo de configuração
         """
         self.nomeArquivo = nomeArquivo
         self.nomeArquivo += ".pkl"
-        try:
-            self.carrega()
-        except: # se nao conseguir carregar, cria um arquivo novo vazio
-            self.config = []
+        self.caminho = os.path.abspath(os.path.join('data', self.nomeArquivo))
+        self._blocos = []           # Blocos lote() abertos por esta instância
+
+        with Configuracao._lock:
+            self._lote = Configuracao._lotes.setdefault(self.caminho, _EstadoLote())
+            self.config = Configuracao._cache.get(self.caminho)
+            if self.config is None:
+                self.config = {}
+                Configuracao._cache[self.caminho] = self.config
+                try:
+                    self.carrega()
+                except Exception: # se nao conseguir carregar, começa vazio
+                    pass
 
     def limpa(self):
         """
         Remove todas as configurações salvas.
-        
+
         Apaga completamente o arquivo de configuração e cria um novo vazio.
         """
-        self.config = []
-        self.salva()
+        with Configuracao._lock:
+            for chave in self.config:
+                self._registrar(chave)
+            self.config.clear()
+        self._alterado()
 
     def salva(self):
         """
         Salva as configurações atuais no arquivo.
-        
+
         Escreve todas as configurações para o arquivo pickle no diretório 'data/'.
+        Os dados vão primeiro para um arquivo temporário no mesmo diretório, que
+        depois substitui o original com ``os.replace``.
         """
-        with open('data/' + self.nomeArquivo, 'wb') as f:
-            pickle.dump(self.config, f)
+        diretorio = os.path.dirname(self.caminho)
+        os.makedirs(diretorio, exist_ok=True)
+        with Configuracao._lock:
+            # Mantém o formato de lista de pares [chave, valor] das versões anteriores
+            dados = [[chave, valor] for chave, valor in self.config.items()]
+            fd, temporario = tempfile.mkstemp(dir=diretorio, prefix=self.nomeArquivo, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    pickle.dump(dados, f)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temporario, self.caminho)
+            except BaseException:
+                os.unlink(temporario)
+                raise
+            self._lote.pendente = False
 
     def carrega(self):
         """
         Carrega as configurações do arquivo.
-        
+
         Lê as configurações salvas do arquivo pickle no diretório 'data/'.
-        
+        Aceita tanto a lista de pares ``[chave, valor]`` quanto um dicionário.
+
         Raises:
             FileNotFoundError: Se o arquivo não existir
             pickle.UnpicklingError: Se o arquivo estiver corrompido
         """
-        with open('data/' + self.nomeArquivo, 'rb') as f:
-            self.config = pickle.load(f)
+        with open(self.caminho, 'rb') as f:
+            dados = pickle.load(f)
+        if not isinstance(dados, dict):
+            dados = {chave: valor for chave, valor in dados}
+        with Configuracao._lock:
+            # Atualiza o dicionário no lugar para que as outras instâncias vejam
+            self.config.clear()
+            self.config.update(dados)
 
     def obtem(self, chave):
         """
         Obtém um valor de configuração salvo.
-        
+
         Args:
             chave (str): Nome da configuração a ser recuperada
-            
+
         Returns:
             any: Valor salvo ou None se não encontrado
-            
+
         Example:
             >>> config = Configuracao("teste")
             >>> config.insere("nome", "Gabriel")
@@ -82,31 +155,95 @@ class Configuracao:
             >>> print(nome)
             Gabriel
         """
-        for i in self.config:
-            if i[0] == chave:
-                return i[1]
-        return None
-    
+        return self.config.get(chave)
+
     def insere(self, chave, valor):
         """
         Insere ou atualiza um valor de configuração.
-        
+
         Se a chave já existir, atualiza o valor. Caso contrário, adiciona uma nova
-        configuração. As alterações são salvas automaticamente.
-        
+        configuração. As alterações são salvas automaticamente, ou uma única vez
+        ao fim do bloco quando feitas dentro de ``lote()``.
+
         Args:
             chave (str): Nome da configuração
             valor (any): Valor a ser salvo
-            
+
         Example:
             >>> config = Configuracao("teste")
             >>> config.insere("idade", 25)
             >>> config.insere("idade", 26)  # Atualiza valor existente
         """
-        for i in self.config:
-            if i[0] == chave:
-                i[1] = valor
+        with Configuracao._lock:
+            self._registrar(chave)
+            self.config[chave] = valor
+        self._alterado()
+
+    @contextmanager
+    def lote(self):
+        """
+        Agrupa várias alterações em uma única gravação.
+
+        O arquivo é salvo uma vez ao sair do bloco mais externo. Se um bloco
+        (mesmo aninhado) terminar com exceção, as chaves alteradas nele voltam
+        ao valor que tinham na entrada; se for o mais externo, nada dele é
+        gravado. O lote vale para o arquivo: alterações de outras instâncias
+        do mesmo arquivo feitas durante o bloco esperam o fim dele e são
+        mantidas (e gravadas) mesmo se o bloco falhar.
+
+        Example:
+            >>> config = Configuracao("teste")
+            >>> with config.lote():
+            ...     config.insere("branco", (645, 733, 527, 1967))
+            ...     config.insere("preto", (72, 72, 50, 198))
+        """
+        # O lock só protege a entrada e o fim do bloco: o código do usuário roda sem ele
+        with Configuracao._lock:
+            bloco = _Bloco()
+            self._blocos.append(bloco)
+            inicio = self._lote.alteracoes
+            self._lote.nivel += 1
+        try:
+            yield self
+        except BaseException:
+            with Configuracao._lock:
+                for chave, anterior in bloco.anteriores.items():
+                    if anterior is _AUSENTE:
+                        self.config.pop(chave, None)
+                    else:
+                        self.config[chave] = anterior
+                self._blocos.pop()
+                self._lote.nivel -= 1
+                salvar = False
+                if self._lote.nivel == 0:
+                    # Só grava se outras instâncias alteraram o arquivo durante o bloco
+                    salvar = self._lote.alteracoes - inicio > bloco.alteracoes
+                    self._lote.pendente = salvar
+            if salvar:
                 self.salva()
-                return
-        self.config.append([chave, valor])
-        self.salva()
\ No newline at end of file
+            raise
+        with Configuracao._lock:
+            self._blocos.pop()
+            if self._blocos:    # O bloco de fora passa a responder pelas chaves deste
+                for chave, anterior in bloco.anteriores.items():
+                    self._blocos[-1].anteriores.setdefault(chave, anterior)
+            self._lote.nivel -= 1
+            salvar = self._lote.nivel == 0 and self._lote.pendente
+        if salvar:
+            self.salva()
+
+    def _registrar(self, chave):
+        """Guarda o valor anterior da chave no bloco lote() aberto (chamado com o lock)"""
+        if self._blocos:
+            self._blocos[-1].anteriores.setdefault(chave, self.config.get(chave, _AUSENTE))
+
+    def _alterado(self):
+        """Salva agora ou, dentro de um lote, adia a gravação para o fim do bloco"""
+        with Configuracao._lock:
+            self._lote.pendente = True
+            self._lote.alteracoes += 1
+            for bloco in self._blocos:
+                bloco.alteracoes += 1
+            em_lote = self._lote.nivel > 0
+        if not em_lote:
+            self.salva()
@@ -0,0 +1,104 @@
+import time
+import numpy as np
+from sensores.instrumentacao import dormir
+
+INTERVALO_POLL = 0.002    # Espera antes de consultar de novo um sensor que ainda não terminou
+
+
+class Escalonador:
+    """
+    Lê vários sensores atrás do TCA9548A com as conversões sobrepostas.
+
+    Todos os sensores são disparados de uma vez e colhidos quando cada um
+    termina a sua conversão (tempo de integração do TCS34725, medição do
+    VL53L0X); quem é colhido é disparado de novo na mesma hora. Assim N sensores
+    levam praticamente o tempo de um, em vez de N vezes mais. Os acessos de cada
+    passo seguem a ordem dos canais a partir do canal já ativo no multiplexador,
+    para trocar de canal o mínimo possível.
+
+    Args:
+        sensores (list): Sensores com suporte a amostragem (TCS34725, VL53L0X)
+        intervalo_poll (float): Nova tentativa (s) para quem ainda não terminou
+
+    Example:
+        >>> cores = [TCS34725(canal_mux=c) for c in (Porta.I2C2, Porta.I2C3)]
+        >>> distancia = VL53L0X(canal_mux=Porta.I2C1)
+        >>> escalonador = Escalonador(cores + [distancia])
+        >>> for sensor, amostra in escalonador.amostras():
+        ...     print(sensor.canal_mux, amostra)
+    """
+
+    def __init__(self, sensores, intervalo_poll=INTERVALO_POLL):
+        for sensor in sensores:
+            if sensor.CANAIS_AMOSTRA is None:
+                raise TypeError(f"{type(sensor).__name__} não suporta amostragem contínua.")
+        self.sensores = list(sensores)
+        self.intervalo_poll = intervalo_poll
+        # Uma linha pré-alocada por sensor, reaproveitada a cada amostra
+        self._destinos = {s: np.zeros(s.CANAIS_AMOSTRA, dtype=s.TIPO_AMOSTRA) for s in self.sensores}
+        self._prazos = {}           # sensor -> instante (time.monotonic) previsto para o resultado
+
+    def _em_ordem(self, sensores):
+        """Ordena por barramento e canal, começando pelo canal ativo de cada barramento"""
+        def chave(sensor):
+            barramento = sensor.barramento
+            ativo = barramento.canal_ativo or 0
+            return barramento.numero, (sensor.canal_mux - ativo) % 8, sensor.address
+        return sorted(sensores, key=chave)
+
+    def _disparar(self, sensor, agora):
+        sensor._disparar_amostra()
+        self._prazos[sensor] = agora + sensor.periodo_amostragem()
+
+    def iniciar(self):
+        """Dispara a conversão de todos os sensores"""
+        agora = time.monotonic()
+        for sensor in self._em_ordem(self.sensores):
+            self._disparar(sensor, agora)
+
+    def _esperar(self, sensores):
+        """Dorme até o prazo mais próximo entre os sensores indicados"""
+        restante = min(self._prazos[s] for s in sensores) - time.monotonic()
+        if restante > 0:
+            dormir(restante, "escalonador.espera")
+
+    def _colher(self, sensores):
+        """Colhe os sensores com prazo vencido; retorna os que tinham resultado novo"""
+        agora = time.monotonic()
+        vencidos = [s for s in sensores if self._prazos[s] <= agora]
+        colhidos = []
+        for sensor in self._em_ordem(vencidos):
+            if sensor._coletar_amostra(self._destinos[sensor]):
+                self._disparar(sensor, time.monotonic())
+                colhidos.append(sensor)
+            else:
+                self._prazos[sensor] = agora + self.intervalo_poll
+        return colhidos
+
+    def rodada(self):
+        """
+        Retorna {sensor: amostra} com uma amostra nova de cada sensor
+        As amostras são arrays reaproveitados, válidos até a próxima leitura.
+        """
+        if not self._prazos:
+            self.iniciar()
+        pendentes = set(self.sensores)
+        resultado = {}
+        while pendentes:
+            self._esperar(pendentes)
+            for sensor in self._colher(pendentes):
+                resultado[sensor] = self._destinos[sensor]
+                pendentes.discard(sensor)
+        return resultado
+
+    def amostras(self):
+        """
+        Gerador infinito de (sensor, amostra), na ordem em que os resultados ficam prontos
+        Cada sensor roda no seu próprio ritmo; a amostra é um array reaproveitado.
+        """
+        if not self._prazos:
+            self.iniciar()
+        while True:
+            self._esperar(self.sensores)
+            for sensor in self._colher(self.sensores):
+                yield sensor, self._destinos[sensor]
@@ -0,0 +1,92 @@
+import math
+from statistics import NormalDist
+import numpy as np
+from sensores.instrumentacao import dormir
+
+
+class EstatisticaOnline:
+    """
+    Média e variância incrementais (algoritmo de Welford), por canal.
+
+    Cada amostra custa O(1) e não é guardada. Com ``limite_outlier`` definido,
+    amostras a mais de ``limite_outlier`` desvios padrão da média atual (em
+    qualquer canal) são descartadas e contadas em ``rejeitadas``, depois de
+    ``minimo`` amostras aceitas. O desvio usado na rejeição nunca é menor que
+    ``resolucao``: um canal constante nas primeiras amostras (contagens ou mm
+    inteiros) não passa a rejeitar qualquer leitura que mude um passo.
+
+    Args:
+        limite_outlier (float): Desvios padrão para rejeitar uma amostra (None = nunca)
+        minimo (int): Amostras aceitas antes de começar a rejeitar
+        resolucao (float): Passo de quantização das leituras (menor desvio considerado)
+    """
+
+    def __init__(self, limite_outlier=None, minimo=10, resolucao=1.0):
+        self.limite_outlier = limite_outlier
+        self.minimo = minimo
+        self.resolucao = resolucao
+        self.n = 0
+        self.rejeitadas = 0
+        self.media = None
+        self._m2 = None
+
+    def adicionar(self, amostra):
+        """Inclui uma amostra (número ou vetor); retorna False se ela foi rejeitada"""
+        x = np.atleast_1d(np.asarray(amostra, dtype=np.float64))
+        if self.media is None:
+            self.media = np.zeros_like(x)
+            self._m2 = np.zeros_like(x)
+        elif self.limite_outlier is not None and self.n >= self.minimo:
+            desvio = self.desvio
+            if np.any(np.abs(x - self.media) > self.limite_outlier * np.maximum(desvio, self.resolucao)):
+                self.rejeitadas += 1
+                return False
+        self.n += 1
+        delta = x - self.media
+        self.media += delta / self.n
+        self._m2 += delta * (x - self.media)
+        return True
+
+    @property
+    def variancia(self):
+        """Variância amostral (n - 1) de cada canal"""
+        if self.n < 2:
+            return np.zeros_like(self.media) if self.media is not None else None
+        return self._m2 / (self.n - 1)
+
+    @property
+    def desvio(self):
+        """Desvio padrão amostral de cada canal"""
+        variancia = self.variancia
+        return None if variancia is None else np.sqrt(variancia)
+
+    def meia_largura(self, confianca=0.95):
+        """Meia largura do intervalo de confiança da média, por canal"""
+        if self.n < 2:
+            return np.full_like(self.media, math.inf)
+        z = NormalDist().inv_cdf(0.5 + confianca / 2)
+        return z * self.desvio / math.sqrt(self.n)
+
+
+def medir_ate_estabilizar(ler, maximo, tolerancia=0.0, tolerancia_relativa=0.0,
+                          confianca=0.95, minimo=10, limite_outlier=4.0, intervalo=0.0, resolucao=1.0):
+    """
+    Lê amostras até a média ficar conhecida com a precisão pedida
+    ler        -> função sem argumentos que retorna uma leitura (número ou vetor)
+    maximo     -> limite rígido de leituras (incluindo as rejeitadas)
+    tolerancia / tolerancia_relativa -> para quando, em todos os canais, a meia largura
+                  do intervalo de confiança for <= tolerancia + tolerancia_relativa * |média|
+    intervalo  -> espera (s) entre leituras, para não repetir a mesma amostra
+    resolucao  -> passo de quantização das leituras (ver EstatisticaOnline)
+    Retorna a EstatisticaOnline final.
+    """
+    estatistica = EstatisticaOnline(limite_outlier, minimo, resolucao)
+    for i in range(maximo):
+        if i and intervalo:
+            dormir(intervalo, "calibracao")
+        estatistica.adicionar(ler())
+        if estatistica.n >= minimo:
+            limite = tolerancia + tolerancia_relativa * np.abs(estatistica.media)
+            if np.all(estatistica.meia_largura(confianca) <= limite):
+                break
+    return estatistica
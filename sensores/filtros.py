@@ -0,0 +1,176 @@
+import bisect
+import math
+import numpy as np
+
+
+class Filtro:
+    """
+    Base dos filtros de leitura: estado de tamanho fixo, custo por amostra que não
+    cresce com o histórico (constante, ou O(janela) na MedianaMovel).
+
+    Uma amostra pode ser um número (distância) ou um vetor (R, G, B, C); o formato
+    é fixado pela primeira amostra. ``atualizar`` processa uma leitura e
+    ``filtrar`` um lote (N,) ou (N, canais), com o mesmo resultado de chamar
+    ``atualizar`` linha a linha. Para filtrar o que um driver retorna, atribua o
+    filtro ao sensor: ``sensor.filtro = MediaMovel(5)``.
+    """
+
+    def __init__(self):
+        self._escalar = None    # True se as amostras são números (None = ainda sem amostras)
+
+    def reiniciar(self):
+        """Descarta o histórico"""
+        self._escalar = None
+
+    def _preparar(self, valor):
+        """Converte a amostra em vetor float64 e inicializa o estado na primeira vez"""
+        vetor = np.atleast_1d(np.asarray(valor, dtype=np.float64))
+        if self._escalar is None:
+            self._escalar = np.ndim(valor) == 0
+            self._iniciar(vetor)
+        return vetor
+
+    def _resultado(self, vetor):
+        # Cópia: o estado interno é reaproveitado e mudaria na próxima leitura
+        return float(vetor[0]) if self._escalar else vetor.copy()
+
+    def atualizar(self, valor):
+        """Recebe uma leitura e retorna o valor filtrado (número ou array novo)"""
+        return self._resultado(self._passo(self._preparar(valor)))
+
+    def filtrar(self, amostras):
+        """Filtra um lote de leituras, em ordem; retorna um array float64 do mesmo formato"""
+        amostras = np.asarray(amostras, dtype=np.float64)
+        saida = np.empty_like(amostras)
+        for i, amostra in enumerate(amostras):
+            vetor = self._passo(self._preparar(amostra if amostra.ndim else amostra.item()))
+            saida[i] = vetor if amostra.ndim else vetor[0]
+        return saida
+
+    def _iniciar(self, vetor):
+        raise NotImplementedError
+
+    def _passo(self, vetor):
+        raise NotImplementedError
+
+
+class MediaMovel(Filtro):
+    """
+    Média das últimas `janela` leituras, com soma corrente (O(1) por amostra)
+
+    Args:
+        janela (int): Número de leituras na média
+    """
+
+    def __init__(self, janela):
+        super().__init__()
+        self.janela = janela
+
+    def _iniciar(self, vetor):
+        self._historico = np.zeros((self.janela, vetor.size))
+        self._soma = np.zeros(vetor.size)
+        self._saida = np.zeros(vetor.size)
+        self._n = 0
+
+    def _passo(self, vetor):
+        i = self._n % self.janela
+        self._soma -= self._historico[i]    # Linha zerada enquanto a janela não enche
+        self._soma += vetor
+        self._historico[i] = vetor
+        self._n += 1
+        np.divide(self._soma, min(self._n, self.janela), out=self._saida)
+        return self._saida
+
+
+class SuavizacaoExponencial(Filtro):
+    """
+    Média móvel exponencial: y = y + alfa * (x - y)
+
+    Args:
+        alfa (float): Peso da leitura nova (0 < alfa <= 1); maior reage mais rápido
+    """
+
+    def __init__(self, alfa):
+        super().__init__()
+        if not 0 < alfa <= 1:
+            raise ValueError("alfa deve estar em (0, 1].")
+        self.alfa = alfa
+
+    def _iniciar(self, vetor):
+        self._y = vetor.copy()      # A primeira leitura inicia a média
+
+    def _passo(self, vetor):
+        self._y += self.alfa * (vetor - self._y)
+        return self._y
+
+
+class MedianaMovel(Filtro):
+    """
+    Mediana das últimas `janela` leituras, resistente a leituras espúrias
+
+    Mantém, por canal, a janela ordenada: cada amostra remove a mais antiga e
+    insere a nova por busca binária. A busca é O(log janela), mas abrir e fechar
+    espaço na lista desloca até `janela` itens: O(janela) por canal e amostra,
+    um memmove curto para as janelas pequenas usadas com sensores.
+
+    Args:
+        janela (int): Número de leituras consideradas
+    """
+
+    def __init__(self, janela):
+        super().__init__()
+        self.janela = janela
+
+    def _iniciar(self, vetor):
+        self._historico = np.zeros((self.janela, vetor.size))
+        self._ordenadas = [[] for _ in range(vetor.size)]
+        self._saida = np.zeros(vetor.size)
+        self._n = 0
+
+    def _passo(self, vetor):
+        i = self._n % self.janela
+        cheia = self._n >= self.janela
+        for canal, ordenada in enumerate(self._ordenadas):
+            if cheia:
+                del ordenada[bisect.bisect_left(ordenada, self._historico[i, canal])]
+            bisect.insort(ordenada, vetor[canal])
+            meio = len(ordenada) // 2
+            if len(ordenada) % 2:
+                self._saida[canal] = ordenada[meio]
+            else:
+                self._saida[canal] = (ordenada[meio - 1] + ordenada[meio]) / 2
+        self._historico[i] = vetor
+        self._n += 1
+        return self._saida
+
+
+class Kalman1D(Filtro):
+    """
+    Filtro de Kalman de uma dimensão (valor constante mais ruído), por canal
+
+    Args:
+        ruido_processo (float): Variância de quanto o valor real muda entre leituras (q)
+        ruido_medicao (float): Variância do ruído do sensor (r), ex.: desvio² da calibração
+    """
+
+    def __init__(self, ruido_processo, ruido_medicao):
+        super().__init__()
+        self.q = ruido_processo
+        self.r = ruido_medicao
+
+    def _iniciar(self, vetor):
+        self._x = vetor.copy()
+        self._p = np.full(vetor.size, float(self.r))    # Incerteza inicial = a de uma leitura
+        self._ganho = np.zeros(vetor.size)
+
+    def _passo(self, vetor):
+        self._p += self.q
+        np.divide(self._p, self._p + self.r, out=self._ganho)
+        self._x += self._ganho * (vetor - self._x)
+        self._p *= 1 - self._ganho
+        return self._x
+
+    @property
+    def desvio(self):
+        """Desvio padrão estimado do valor filtrado"""
+        return math.sqrt(self._p[0]) if self._escalar else np.sqrt(self._p)
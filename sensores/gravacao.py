@@ -0,0 +1,264 @@
+import ctypes
+import errno
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import deque, namedtuple
+
+from sensores.i2cmodule import TCA9548A_ADDR
+
+# Arquivo: cabeçalho (mágico, instante de início em ns desde a época) + registros.
+# Registro: instante (ns desde o início), canal do mux (0xFF = nenhum), endereço,
+# registrador, tipo (código da operação, bit 0x80 = erro) e tamanho, seguidos
+# dos bytes de dados (ou do errno, em 2 bytes, se a operação falhou).
+MAGICO = b"I2CGRV1\n"
+CABECALHO = struct.Struct("<8sQ")
+REGISTRO = struct.Struct("<QBBBBH")
+
+SEM_CANAL = 0xFF
+ERRO = 0x80
+
+# Operação do SMBus -> código gravado
+OPERACOES = {
+    "read_byte_data": 1,
+    "write_byte_data": 2,
+    "read_i2c_block_data": 3,
+    "write_i2c_block_data": 4,
+    "i2c_rdwr": 5,          # Um registro por leitura (ponteiro + leitura) da transação combinada
+    "i2c_rdwr_escritas": 6, # Um registro por escrita (ponteiro + dados) da transação combinada
+}
+NOMES_OPERACOES = {codigo: nome for nome, codigo in OPERACOES.items()}
+LEITURAS = {OPERACOES["read_byte_data"], OPERACOES["read_i2c_block_data"], OPERACOES["i2c_rdwr"]}
+I2C_M_RD = 0x0001
+
+Transacao = namedtuple("Transacao", "tempo canal endereco registrador operacao leitura dados erro")
+Transacao.__doc__ = """Transação gravada: tempo (s desde o início), dados (bytes) e erro (errno ou None)"""
+
+
+class Gravador:
+    """
+    Grava as transações I2C num arquivo binário compacto, mapeado em memória.
+
+    Cada registro ocupa 14 bytes mais os dados e é copiado direto no mapa, sem
+    chamada de sistema por transação; o arquivo cresce em blocos e só recebe
+    registros novos no fim. Como o mapa é compartilhado com o arquivo, o que já
+    foi gravado sobrevive a uma queda do processo (o leitor para no primeiro
+    registro vazio).
+
+    Args:
+        caminho (str): Arquivo de gravação (sobrescrito se existir)
+        bloco (int): Bytes reservados a cada vez que o arquivo cresce
+
+    Example:
+        >>> from sensores.i2cmodule import definir_gravador
+        >>> gravador = Gravador("sessao.i2c")
+        >>> definir_gravador(gravador)     # Toda transação passa a ser gravada
+        >>> ...
+        >>> definir_gravador(None)
+        >>> gravador.fechar()
+    """
+
+    def __init__(self, caminho, bloco=1 << 20):
+        self.caminho = caminho
+        self.bloco = bloco
+        self._arquivo = open(caminho, "w+b")
+        self._arquivo.truncate(bloco)
+        self._mapa = mmap.mmap(self._arquivo.fileno(), bloco)
+        self._inicio = time.monotonic_ns()
+        CABECALHO.pack_into(self._mapa, 0, MAGICO, time.time_ns())
+        self._posicao = CABECALHO.size
+        self._lock = threading.Lock()
+        self.transacoes = 0
+
+    def registrar(self, canal, endereco, operacao, args, resultado=None, erro=None):
+        """
+        Acrescenta uma transação (chamado pelo BarramentoI2C)
+        args -> argumentos da operação do SMBus depois do endereço
+        """
+        if erro is not None:
+            registrador = args[0][0][0] if operacao.startswith("i2c_rdwr") else args[0]
+            partes = [(registrador, struct.pack("<H", erro.errno or 0))]
+        elif operacao == "i2c_rdwr":
+            partes = [(reg, bytes(dados)) for (reg, _), dados in zip(args[0], resultado)]
+        elif operacao == "i2c_rdwr_escritas":
+            partes = [(reg, bytes(dados)) for reg, dados in args[0]]
+        elif operacao == "read_byte_data":
+            partes = [(args[0], bytes((resultado,)))]
+        elif operacao == "write_byte_data":
+            partes = [(args[0], bytes((args[1],)))]
+        elif operacao == "read_i2c_block_data":
+            partes = [(args[0], bytes(resultado))]
+        else:
+            partes = [(args[0], bytes(args[1]))]
+        tipo = OPERACOES[operacao] | (ERRO if erro is not None else 0)
+        instante = time.monotonic_ns() - self._inicio
+        with self._lock:
+            for registrador, dados in partes:
+                fim = self._posicao + REGISTRO.size + len(dados)
+                if fim > len(self._mapa):
+                    self._crescer(fim)
+                REGISTRO.pack_into(self._mapa, self._posicao, instante,
+                                   SEM_CANAL if canal is None else canal,
+                                   endereco, registrador, tipo, len(dados))
+                self._mapa[self._posicao + REGISTRO.size:fim] = dados
+                self._posicao = fim
+            self.transacoes += 1
+
+    def _crescer(self, minimo):
+        """Aumenta o arquivo em blocos até caber `minimo` bytes e refaz o mapa"""
+        tamanho = len(self._mapa)
+        while tamanho < minimo:
+            tamanho += self.bloco
+        self._mapa.close()
+        self._arquivo.truncate(tamanho)
+        self._mapa = mmap.mmap(self._arquivo.fileno(), tamanho)
+
+    def fechar(self):
+        """Grava o que falta e corta o espaço reservado não usado"""
+        with self._lock:
+            if self._mapa is None:
+                return
+            self._mapa.flush()
+            self._mapa.close()
+            self._mapa = None
+            self._arquivo.truncate(self._posicao)
+            self._arquivo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+
+def ler_gravacao(caminho):
+    """
+    Retorna (inicio, transacoes): o instante de início (s desde a época) e a
+    lista de Transacao do arquivo, em ordem
+    """
+    with open(caminho, "rb") as arquivo:
+        conteudo = arquivo.read()
+    magico, inicio_ns = CABECALHO.unpack_from(conteudo, 0)
+    if magico != MAGICO:
+        raise ValueError(f"{caminho} não é uma gravação I2C.")
+    transacoes = []
+    posicao = CABECALHO.size
+    while posicao + REGISTRO.size <= len(conteudo):
+        instante, canal, endereco, registrador, tipo, tamanho = REGISTRO.unpack_from(conteudo, posicao)
+        if tipo == 0:       # Espaço reservado: a gravação não foi fechada
+            break
+        posicao += REGISTRO.size
+        dados = conteudo[posicao:posicao + tamanho]
+        posicao += tamanho
+        operacao = tipo & ~ERRO
+        erro = struct.unpack("<H", dados)[0] if tipo & ERRO else None
+        transacoes.append(Transacao(instante / 1e9, None if canal == SEM_CANAL else canal,
+                                    endereco, registrador, NOMES_OPERACOES[operacao],
+                                    operacao in LEITURAS, b"" if erro is not None else dados, erro))
+    return inicio_ns / 1e9, transacoes
+
+
+class BarramentoReproduzido:
+    """
+    Backend I2C que devolve as respostas de uma gravação, sem hardware.
+
+    As transações são separadas por (canal, endereço, operação, registrador) e
+    cada leitura devolve a próxima resposta gravada para a sua chave. Assim a
+    sessão é reproduzida mesmo que o número de consultas de espera mude (o
+    driver roda sem dormir, por exemplo). Erros gravados são levantados de
+    novo como OSError. Com ``verificar_escritas``, uma escrita diferente da
+    gravada levanta RuntimeError, o que serve de teste de regressão.
+
+    Args:
+        caminho (str): Arquivo criado pelo Gravador
+        verificar_escritas (bool): Compara cada escrita com a gravada
+
+    Example:
+        >>> from sensores.i2cmodule import definir_backend
+        >>> reproducao = BarramentoReproduzido("sessao.i2c")
+        >>> definir_backend(lambda numero: reproducao)
+        >>> sensor = TCS34725(canal_mux=Porta.I2C2)
+        >>> sensor.ler_cores()      # As mesmas leituras da sessão gravada
+    """
+
+    def __init__(self, caminho, verificar_escritas=True):
+        self.verificar_escritas = verificar_escritas
+        self.inicio, transacoes = ler_gravacao(caminho)
+        self._filas = {}
+        for transacao in transacoes:
+            chave = (transacao.canal, transacao.endereco, transacao.operacao, transacao.registrador)
+            self._filas.setdefault(chave, deque()).append(transacao)
+        self.canal = None
+
+    def restantes(self):
+        """Quantas transações gravadas ainda não foram reproduzidas"""
+        return sum(len(fila) for fila in self._filas.values())
+
+    def _proxima(self, endereco, operacao, registrador):
+        fila = self._filas.get((self.canal, endereco, operacao, registrador))
+        if not fila:
+            return None
+        transacao = fila.popleft()
+        if transacao.erro is not None:
+            raise OSError(transacao.erro, os.strerror(transacao.erro))
+        return transacao
+
+    def _ler(self, endereco, operacao, registrador):
+        transacao = self._proxima(endereco, operacao, registrador)
+        if transacao is None:
+            raise RuntimeError(f"Gravação sem mais respostas para {operacao} em "
+                               f"{hex(endereco)}, registrador {hex(registrador)}, canal {self.canal}.")
+        return transacao.dados
+
+    def _escrever(self, endereco, operacao, registrador, dados):
+        transacao = self._proxima(endereco, operacao, registrador)
+        if not self.verificar_escritas:
+            return
+        if transacao is None or transacao.dados != bytes(dados):
+            gravado = None if transacao is None else list(transacao.dados)
+            raise RuntimeError(f"{operacao} em {hex(endereco)}, registrador {hex(registrador)}, "
+                               f"canal {self.canal}: escrito {list(dados)}, gravado {gravado}.")
+
+    # ----- INTERFACE SMBus -----
+    def write_byte(self, endereco, valor):
+        if endereco != TCA9548A_ADDR:
+            raise OSError(errno.EREMOTEIO, f"Escrita direta em {hex(endereco)} não é reproduzida")
+        self.canal = valor.bit_length() - 1 if valor else None
+
+    def read_byte_data(self, endereco, reg):
+        return self._ler(endereco, "read_byte_data", reg)[0]
+
+    def write_byte_data(self, endereco, reg, valor):
+        self._escrever(endereco, "write_byte_data", reg, (valor,))
+
+    def read_i2c_block_data(self, endereco, reg, tamanho):
+        dados = self._ler(endereco, "read_i2c_block_data", reg)
+        if len(dados) != tamanho:
+            raise RuntimeError(f"Leitura de {tamanho} bytes em {hex(endereco)}, registrador "
+                               f"{hex(reg)}; a gravação tem {len(dados)}.")
+        return list(dados)
+
+    def write_i2c_block_data(self, endereco, reg, dados):
+        self._escrever(endereco, "write_i2c_block_data", reg, dados)
+
+    def i2c_rdwr(self, *mensagens):
+        """Reproduz transações combinadas: pares (ponteiro, leitura) ou só escritas"""
+        if not any(mensagem.flags & I2C_M_RD for mensagem in mensagens):
+            for mensagem in mensagens:
+                dados = bytes(mensagem)
+                self._escrever(mensagem.addr, "i2c_rdwr_escritas", dados[0], dados[1:])
+            return
+        for escrita, leitura in zip(mensagens[::2], mensagens[1::2]):
+            if len(mensagens) % 2 or escrita.flags & I2C_M_RD or not leitura.flags & I2C_M_RD or escrita.len != 1:
+                raise RuntimeError("Só leituras (ponteiro + leitura) ou escritas combinadas são reproduzidas.")
+            reg = bytes(escrita)[0]
+            dados = self._ler(leitura.addr, "i2c_rdwr", reg)
+            if len(dados) != leitura.len:
+                raise RuntimeError(f"Leitura de {leitura.len} bytes em {hex(leitura.addr)}, registrador "
+                                   f"{hex(reg)}; a gravação tem {len(dados)}.")
+            ctypes.memmove(leitura.buf, dados, leitura.len)
+
+    def close(self):
+        pass
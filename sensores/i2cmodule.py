@@ -1,18 +1,326 @@
-from smbus2 import SMBus
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from sensores import instrumentacao
 
-I2C_DEVICE = 1  
+I2C_DEVICE = 1           # Barramento padrão (/dev/i2c-1)
 TCA9548A_ADDR = 0x70     # Endereço do multiplexador TCA9548A
+MAX_MENSAGENS = 42       # Mensagens por ioctl I2C_RDWR (I2C_RDWR_IOCTL_MAX_MSGS do kernel)
 
-class I2CModule: 
-    def __init__(self, address, canal_mux):
-        self.bus = SMBus(I2C_DEVICE)
+
+def _abrir_smbus(numero):
+    """Backend padrão: o barramento real (smbus2 só é importado aqui)"""
+    from smbus2 import SMBus
+    return SMBus(numero)
+
+
+def _carregar_i2c_msg():
+    """smbus2.i2c_msg para montar transações combinadas (None sem smbus2)"""
+    global _i2c_msg
+    try:
+        from smbus2 import i2c_msg
+    except ImportError:
+        i2c_msg = None
+    _i2c_msg = i2c_msg
+    return i2c_msg
+
+
+_fabrica_backend = _abrir_smbus   # Cria o handle de cada barramento: fabrica(numero)
+_i2c_msg = False                  # smbus2.i2c_msg, carregado na primeira transação combinada
+_gravador = None                  # sensores.gravacao.Gravador ativo (None = não grava)
+
+
+def definir_backend(fabrica=None):
+    """
+    Troca o backend I2C usado pelos barramentos abertos a partir de agora
+    fabrica -> função numero -> objeto com a interface de SMBus (ex.: um
+               sensores.simulacao.BarramentoSimulado); None volta ao smbus2
+    Barramentos já abertos continuam com o backend anterior até serem liberados.
+    """
+    global _fabrica_backend
+    _fabrica_backend = _abrir_smbus if fabrica is None else fabrica
+
+
+def definir_gravador(gravador=None):
+    """
+    Passa a gravar toda transação de todos os barramentos no gravador indicado
+    gravador -> sensores.gravacao.Gravador (None para de gravar)
+    """
+    global _gravador
+    _gravador = gravador
+
+
+class BarramentoI2C:
+    """
+    Handle SMBus compartilhado por todos os módulos de um mesmo barramento.
+
+    Existe uma única instância por número de barramento no processo. Ela guarda
+    qual canal do TCA9548A está ativo e só escreve no multiplexador quando uma
+    transação precisa de um canal diferente. Todo acesso passa pelo ``lock``,
+    então a troca de canal e a operação no dispositivo nunca se intercalam.
+
+    Cada barramento tem ainda uma thread de trabalho própria (criada no primeiro
+    ``submeter``) com sua fila de pedidos: pedidos de um mesmo barramento rodam
+    em ordem, e barramentos diferentes rodam ao mesmo tempo.
+    """
+
+    _instancias = {}
+    _lock_instancias = threading.Lock()
+
+    def __init__(self, numero):
+        self.numero = numero
+        self.bus = _fabrica_backend(numero)
+        self.canal_ativo = None         # Canal do mux selecionado (None = desconhecido)
+        self.lock = threading.RLock()
+        self._referencias = 0
+        self._executor = None           # Thread de trabalho (criada sob demanda)
+        self._thread_trabalho = None
+
+    @classmethod
+    def obter(cls, numero=I2C_DEVICE):
+        """Retorna o barramento compartilhado, abrindo o handle na primeira vez"""
+        with cls._lock_instancias:
+            barramento = cls._instancias.get(numero)
+            if barramento is None:
+                barramento = cls(numero)
+                cls._instancias[numero] = barramento
+            barramento._referencias += 1
+            return barramento
+
+    def liberar(self):
+        """Devolve uma referência; o handle é fechado quando ninguém mais o usa"""
+        with BarramentoI2C._lock_instancias:
+            self._referencias -= 1
+            if self._referencias > 0:
+                return
+            if BarramentoI2C._instancias.get(self.numero) is self:
+                del BarramentoI2C._instancias[self.numero]
+        if self._executor is not None:
+            # Termina os pedidos na fila (sem esperar se o último close veio da própria thread)
+            self._executor.shutdown(wait=threading.get_ident() != self._thread_trabalho)
+        self.bus.close()
+
+    def _iniciar_trabalho(self):
+        self._thread_trabalho = threading.get_ident()
+
+    def submeter(self, funcao, *args, **kwargs):
+        """
+        Executa funcao(*args, **kwargs) na thread de trabalho deste barramento
+        Retorna um concurrent.futures.Future com o resultado.
+        """
+        if self._executor is None:
+            with BarramentoI2C._lock_instancias:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=1, thread_name_prefix=f"i2c-{self.numero}",
+                        initializer=self._iniciar_trabalho)
+        return self._executor.submit(funcao, *args, **kwargs)
+
+    def selecionar_canal(self, canal):
+        """Ativa o canal no TCA9548A apenas se ele ainda não estiver ativo"""
+        with self.lock:
+            if canal == self.canal_ativo:
+                return
+            self.canal_ativo = None     # Estado incerto até a escrita terminar
+            if instrumentacao.ativo:
+                inicio = time.perf_counter()
+                self.bus.write_byte(TCA9548A_ADDR, 1 << canal)
+                instrumentacao.registrar_transacao(
+                    TCA9548A_ADDR, canal, "selecionar_canal", 1, time.perf_counter() - inicio)
+            else:
+                self.bus.write_byte(TCA9548A_ADDR, 1 << canal)
+            self.canal_ativo = canal
+
+    def _executar(self, canal, nbytes, funcao, endereco, *args):
+        """
+        Seleciona o canal e executa a operação sem que outra thread intercale
+        nbytes -> bytes de dados da operação (contabilizados pela instrumentação)
+        """
+        with self.lock:
+            self.selecionar_canal(canal)
+            try:
+                if not instrumentacao.ativo and _gravador is None:
+                    return funcao(endereco, *args)
+                inicio = time.perf_counter()
+                resultado = funcao(endereco, *args)
+                if instrumentacao.ativo:
+                    instrumentacao.registrar_transacao(
+                        endereco, canal, funcao.__name__, nbytes, time.perf_counter() - inicio)
+                if _gravador is not None:
+                    _gravador.registrar(canal, endereco, funcao.__name__, args, resultado)
+                return resultado
+            except OSError as erro:
+                # Um erro no barramento pode ter resetado o mux: força nova seleção
+                self.canal_ativo = None
+                if _gravador is not None:
+                    _gravador.registrar(canal, endereco, funcao.__name__, args, erro=erro)
+                raise
+
+    # ----- OPERAÇÕES -----
+    def ler_byte(self, canal, endereco, reg):
+        return self._executar(canal, 1, self.bus.read_byte_data, endereco, reg)
+
+    def escrever_byte(self, canal, endereco, reg, valor):
+        self._executar(canal, 1, self.bus.write_byte_data, endereco, reg, valor)
+
+    def ler_bloco(self, canal, endereco, reg, tamanho):
+        return self._executar(canal, tamanho, self.bus.read_i2c_block_data, endereco, reg, tamanho)
+
+    def escrever_bloco(self, canal, endereco, reg, dados):
+        dados = list(dados)
+        self._executar(canal, len(dados), self.bus.write_i2c_block_data, endereco, reg, dados)
+
+    def ler_registradores(self, canal, endereco, leituras):
+        """
+        Lê vários registradores em uma única transação combinada (i2c_rdwr)
+        leituras -> [(reg, tamanho), ...]; para cada uma, escreve o ponteiro e lê
+                    com repeated start, sem STOP no meio (nada se intercala)
+        Retorna uma lista com os bytes de cada leitura. Sem suporte a i2c_rdwr no
+        backend, faz uma leitura em bloco por registrador.
+        """
+        i2c_msg = _carregar_i2c_msg() if _i2c_msg is False else _i2c_msg
+        if i2c_msg is None or not hasattr(self.bus, "i2c_rdwr"):
+            return [self.ler_bloco(canal, endereco, reg, tamanho) for reg, tamanho in leituras]
+        passo = MAX_MENSAGENS // 2
+        if len(leituras) <= passo:
+            return self._executar(canal, sum(t for _, t in leituras), self.i2c_rdwr, endereco, leituras)
+        resultado = []
+        for i in range(0, len(leituras), passo):
+            parte = leituras[i:i + passo]
+            resultado += self._executar(canal, sum(t for _, t in parte), self.i2c_rdwr, endereco, parte)
+        return resultado
+
+    def escrever_registradores(self, canal, endereco, escritas):
+        """
+        Escreve vários blocos de registradores em uma única transação combinada
+        escritas -> [(reg, dados), ...]; cada uma é uma mensagem (ponteiro + dados)
+                    com repeated start entre elas, em vez de uma transação por bloco
+        Sem suporte a i2c_rdwr no backend, faz uma escrita em bloco por item.
+        """
+        i2c_msg = _carregar_i2c_msg() if _i2c_msg is False else _i2c_msg
+        if i2c_msg is None or not hasattr(self.bus, "i2c_rdwr") or len(escritas) == 1:
+            for reg, dados in escritas:
+                self.escrever_bloco(canal, endereco, reg, dados)
+            return
+        escritas = [(reg, list(dados)) for reg, dados in escritas]
+        for i in range(0, len(escritas), MAX_MENSAGENS):
+            parte = escritas[i:i + MAX_MENSAGENS]
+            self._executar(canal, sum(len(d) for _, d in parte), self.i2c_rdwr_escritas, endereco, parte)
+
+    def i2c_rdwr(self, endereco, leituras):
+        """Monta as mensagens e faz um único ioctl I2C_RDWR (use ler_registradores)"""
+        mensagens = []
+        for reg, tamanho in leituras:
+            mensagens.append(_i2c_msg.write(endereco, (reg,)))
+            mensagens.append(_i2c_msg.read(endereco, tamanho))
+        self.bus.i2c_rdwr(*mensagens)
+        return [list(mensagem) for mensagem in mensagens[1::2]]
+
+    def i2c_rdwr_escritas(self, endereco, escritas):
+        """Uma mensagem de escrita por item, em um único ioctl (use escrever_registradores)"""
+        self.bus.i2c_rdwr(*(_i2c_msg.write(endereco, [reg] + dados) for reg, dados in escritas))
+
+
+def executar_em_paralelo(modulos, funcao):
+    """
+    Executa funcao(modulo) para cada módulo, com uma thread por barramento
+    Módulos do mesmo barramento rodam em sequência, na ordem dada; barramentos
+    diferentes rodam ao mesmo tempo. Retorna os resultados na ordem de `modulos`.
+    """
+    grupos = {}
+    for i, modulo in enumerate(modulos):
+        grupos.setdefault(modulo.barramento, []).append(i)
+    if len(grupos) == 1:
+        return [funcao(modulo) for modulo in modulos]
+
+    def executar(indices):
+        return [funcao(modulos[i]) for i in indices]
+
+    futuros = [(indices, barramento.submeter(executar, indices)) for barramento, indices in grupos.items()]
+    resultados = [None] * len(modulos)
+    for indices, futuro in futuros:
+        for i, resultado in zip(indices, futuro.result()):
+            resultados[i] = resultado
+    return resultados
+
+
+class I2CModule:
+    # Formato das amostras para sensores.amostragem (None = não suporta amostragem contínua)
+    CANAIS_AMOSTRA = None
+    TIPO_AMOSTRA = "uint16"
+
+    def __init__(self, address, canal_mux, barramento=I2C_DEVICE):
+        """barramento -> número do adaptador I2C (/dev/i2c-N) onde está o módulo"""
+        self.barramento = BarramentoI2C.obter(barramento)
         self.address = address
+        self.canal_mux = canal_mux
         self._selecionar_canal_mux(canal_mux)
 
-    def _selecionar_canal_mux(self, canal_mux):
-        """Ativa apenas o canal especificado no multiplexador TCA9548A"""
-        self.bus.write_byte(TCA9548A_ADDR, 1 << canal_mux)
+    @property
+    def bus(self):
+        """Handle SMBus compartilhado (prefira os métodos abaixo, que cuidam do mux)"""
+        return self.barramento.bus
+
+    def _selecionar_canal_mux(self, canal_mux=None):
+        """Ativa o canal do módulo (ou o especificado) no multiplexador TCA9548A"""
+        if canal_mux is None:
+            canal_mux = self.canal_mux
+        self.barramento.selecionar_canal(canal_mux)
+
+    # ----- ACESSO AOS REGISTRADORES -----
+    def _ler_byte(self, reg):
+        return self.barramento.ler_byte(self.canal_mux, self.address, reg)
+
+    def _escrever_byte(self, reg, valor):
+        self.barramento.escrever_byte(self.canal_mux, self.address, reg, valor)
+
+    def _ler_bloco(self, reg, tamanho):
+        return self.barramento.ler_bloco(self.canal_mux, self.address, reg, tamanho)
+
+    def _escrever_bloco(self, reg, dados):
+        self.barramento.escrever_bloco(self.canal_mux, self.address, reg, dados)
+
+    def _ler_registradores(self, leituras):
+        """Lê [(reg, tamanho), ...] em uma transação combinada; retorna os bytes de cada um"""
+        return self.barramento.ler_registradores(self.canal_mux, self.address, leituras)
+
+    def _escrever_registradores(self, escritas):
+        """Escreve [(reg, dados), ...] em uma transação combinada"""
+        self.barramento.escrever_registradores(self.canal_mux, self.address, escritas)
+
+    def submeter(self, metodo, *args, **kwargs):
+        """
+        Executa metodo(*args, **kwargs) na thread do barramento do módulo
+        Ex.: futuro = sensor.submeter(sensor.ler_cores); futuro.result()
+        """
+        return self.barramento.submeter(metodo, *args, **kwargs)
+
+    # ----- AMOSTRAGEM -----
+    def periodo_amostragem(self):
+        """Intervalo natural (s) entre duas leituras novas do sensor"""
+        raise NotImplementedError
+
+    def _ler_amostra(self, destino):
+        """Lê uma amostra bruta direto no array `destino` (CANAIS_AMOSTRA valores)"""
+        raise NotImplementedError
+
+    def _disparar_amostra(self):
+        """Inicia uma conversão sem esperar (padrão: o sensor converte continuamente)"""
+
+    def _coletar_amostra(self, destino):
+        """
+        Lê a conversão disparada em `destino` sem esperar
+        Retorna False se ela ainda não terminou (padrão: sempre pronta).
+        """
+        self._ler_amostra(destino)
+        return True
+
+    def close(self):
+        """Libera o barramento compartilhado (fechado quando o último módulo sair)"""
+        barramento = self.__dict__.pop("barramento", None)
+        if barramento is not None:
+            barramento.liberar()
 
     def __del__(self):
-        """Fecha o barramento I2C ao destruir o objeto"""
-        self.bus.close()
+        """Libera o barramento I2C ao destruir o objeto"""
+        self.close()
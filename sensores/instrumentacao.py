@@ -0,0 +1,166 @@
+import json
+import threading
+import time
+
+# Desligada por padrão: cada ponto instrumentado só testa esta flag
+ativo = False
+
+NUM_FAIXAS = 32     # Faixa i do histograma: [2^(i-1), 2^i) µs; a última acumula o resto
+
+_lock = threading.Lock()
+_transacoes = {}    # (endereço, canal, operação) -> Histograma
+_bytes = {}         # (endereço, canal, operação) -> bytes transferidos
+_sono = {}          # motivo -> Histograma
+_dump = None        # (thread, evento de parada) do dump periódico
+
+
+class Histograma:
+    """
+    Histograma de durações em faixas de potência de 2 (microssegundos).
+
+    Registrar custo O(1) e memória fixa; os percentis são aproximados pelo
+    limite superior da faixa, o que basta para separar 50 µs de 5 ms.
+    """
+
+    __slots__ = ("faixas", "contagem", "total", "minimo", "maximo")
+
+    def __init__(self):
+        self.faixas = [0] * NUM_FAIXAS
+        self.contagem = 0
+        self.total = 0.0
+        self.minimo = float("inf")
+        self.maximo = 0.0
+
+    def registrar(self, segundos):
+        self.faixas[min(NUM_FAIXAS - 1, int(segundos * 1e6).bit_length())] += 1
+        self.contagem += 1
+        self.total += segundos
+        if segundos < self.minimo:
+            self.minimo = segundos
+        if segundos > self.maximo:
+            self.maximo = segundos
+
+    def percentil(self, p):
+        """Limite superior (s) da faixa que contém o percentil p (0-100)"""
+        alvo = self.contagem * p / 100.0
+        acumulado = 0
+        for i, n in enumerate(self.faixas):
+            acumulado += n
+            if n and acumulado >= alvo:
+                return min((1 << i) / 1e6, self.maximo)
+        return self.maximo
+
+    def resumo(self):
+        """Dicionário com contagem, total, média, mínimo, máximo e percentis (em s)"""
+        if not self.contagem:
+            return {"contagem": 0}
+        return {
+            "contagem": self.contagem,
+            "total": self.total,
+            "media": self.total / self.contagem,
+            "min": self.minimo,
+            "max": self.maximo,
+            "p50": self.percentil(50),
+            "p90": self.percentil(90),
+            "p99": self.percentil(99),
+        }
+
+
+def ativar():
+    """Liga a coleta de métricas"""
+    global ativo
+    ativo = True
+
+
+def desativar():
+    """Desliga a coleta (as métricas já coletadas são mantidas)"""
+    global ativo
+    ativo = False
+
+
+def zerar():
+    """Descarta todas as métricas coletadas"""
+    with _lock:
+        _transacoes.clear()
+        _bytes.clear()
+        _sono.clear()
+
+
+def registrar_transacao(endereco, canal, operacao, nbytes, segundos):
+    """Registra uma transação I2C (chamado pelo BarramentoI2C)"""
+    chave = (endereco, canal, operacao)
+    with _lock:
+        histograma = _transacoes.get(chave)
+        if histograma is None:
+            histograma = _transacoes[chave] = Histograma()
+        histograma.registrar(segundos)
+        _bytes[chave] = _bytes.get(chave, 0) + nbytes
+
+
+def dormir(segundos, motivo):
+    """
+    time.sleep que registra quanto tempo foi gasto e por quê
+    Usado pelos drivers em toda espera; cada chamada conta como uma iteração,
+    então o motivo "vl53l0x.poll" também conta as voltas do laço de espera.
+    """
+    if not ativo:
+        time.sleep(segundos)
+        return
+    inicio = time.monotonic()
+    time.sleep(segundos)
+    duracao = time.monotonic() - inicio
+    with _lock:
+        histograma = _sono.get(motivo)
+        if histograma is None:
+            histograma = _sono[motivo] = Histograma()
+        histograma.registrar(duracao)
+
+
+def snapshot():
+    """
+    Retorna as métricas atuais:
+    {"transacoes": {"0x29@1": {operação: resumo + "bytes"}}, "sono": {motivo: resumo}}
+    """
+    with _lock:
+        transacoes = {}
+        for (endereco, canal, operacao), histograma in _transacoes.items():
+            dispositivo = f"{hex(endereco)}@{canal}"
+            resumo = histograma.resumo()
+            resumo["bytes"] = _bytes[(endereco, canal, operacao)]
+            transacoes.setdefault(dispositivo, {})[operacao] = resumo
+        sono = {motivo: h.resumo() for motivo, h in _sono.items()}
+    return {"instante": time.time(), "transacoes": transacoes, "sono": sono}
+
+
+def iniciar_dump(intervalo=10.0, arquivo=None):
+    """
+    Grava um snapshot a cada `intervalo` segundos em uma thread própria
+    arquivo -> caminho de um arquivo JSON Lines (uma linha por snapshot);
+               None imprime na saída padrão
+    """
+    global _dump
+    parar_dump()
+    parar = threading.Event()
+
+    def executar():
+        while not parar.wait(intervalo):
+            linha = json.dumps(snapshot(), ensure_ascii=False)
+            if arquivo is None:
+                print(linha)
+            else:
+                with open(arquivo, "a") as saida:
+                    saida.write(linha + "\n")
+
+    thread = threading.Thread(target=executar, name="Instrumentacao-dump", daemon=True)
+    thread.start()
+    _dump = (thread, parar)
+
+
+def parar_dump():
+    """Para o dump periódico, se houver um em andamento"""
+    global _dump
+    if _dump is not None:
+        thread, parar = _dump
+        parar.set()
+        thread.join()
+        _dump = None
@@ -1,16 +1,29 @@
 import time
+import asyncio
+from sensores.instrumentacao import dormir
+
+VELOCIDADE_PADRAO = 400.0   # Velocidade estimada do servo em graus/s (MG90S: ~0.1 s/60°, com folga)
+ATRASO_PADRAO = 0.02        # Tempo (s) até o servo começar a responder a um novo pulso
 
 class MG90S:
-    def __init__(self, pca, channel, min_ms=500, max_ms=2500, freq=50):
+    def __init__(self, pca, channel, min_ms=500, max_ms=2500, freq=50,
+                 bloqueante=True, velocidade=VELOCIDADE_PADRAO, atraso=ATRASO_PADRAO):
         """
         Inicializa o servo MG90S
+        bloqueante -> set_angle espera o fim do movimento antes de retornar
+        velocidade -> graus por segundo usados para estimar a duração dos movimentos
+        atraso     -> tempo fixo (s) somado a cada movimento
         """
         self.pca = pca              # instância de PCA9685 que controla o PWM
         self.channel = channel      # Canal do PCA9685 onde o servo está conectado
         self.min_ms = min_ms        # Pulso mínimo (em ms) correspondente ao ângulo 0°
         self.max_ms = max_ms        # Pulso máximo (em ms) correspondente ao ângulo 180°
         self.freq = freq            # Frequência de operação do PWM (50 Hz)
+        self.bloqueante = bloqueante
+        self.velocidade = velocidade
+        self.atraso = atraso
         self._last_angle = None      # Armazena o último ângulo definido
+        self._fim_movimento = 0.0    # Instante (time.monotonic) previsto para o fim do movimento
 
         # Configura a frequência do PCA9685 (necessário para que os cálculos de duty cycle fiquem corretos)
         self.pca.set_pwm_freq(freq)
@@ -26,16 +39,104 @@ class MG90S:
         duty_cycle = pulse_ms / period_ms  # Fração do período que o sinal ficará em nível alto
         return duty_cycle
 
-    def set_angle(self, angle):
+    def tempo_movimento(self, angle):
+        """
+        Estima quantos segundos o servo leva do último ângulo até o ângulo pedido
+        Se a posição atual é desconhecida, considera o pior caso (180°).
+        """
+        angle = max(0, min(180, angle))
+        if self._last_angle is None:
+            distancia = 180
+        else:
+            distancia = abs(angle - self._last_angle)
+        return self.atraso + distancia / self.velocidade
+
+    def _registrar_movimento(self, angle):
+        """Atualiza o último ângulo e o instante previsto de fim do movimento"""
+        angle = max(0, min(180, angle))
+        self._fim_movimento = time.monotonic() + self.tempo_movimento(angle)
+        self._last_angle = angle
+        return self._fim_movimento
+
+    def set_angle(self, angle, bloquear=None):
         """
         Move o servo para o ângulo especificado
         Converte o ângulo em duty cycle e envia para o PCA9685
+        Retorna o instante (time.monotonic) estimado para o fim do movimento.
+        bloquear -> sobrepõe o modo bloqueante do servo apenas nesta chamada
         """
         duty = self.angle_to_duty_cycle(angle)              # Converte ângulo para duty cycle
         self.pca.set_pwm_duty_cycle(self.channel, duty)     # Aplica duty cycle no canal correto
-        time.sleep(0.27)
+        fim = self._registrar_movimento(angle)
+        if self.bloqueante if bloquear is None else bloquear:
+            self.aguardar()
+        return fim
+
+    def aguardar(self):
+        """Espera o fim do movimento em andamento"""
+        restante = self._fim_movimento - time.monotonic()
+        if restante > 0:
+            dormir(restante, "mg90s.movimento")
+
+    async def set_angle_async(self, angle):
+        """
+        Versão assíncrona de set_angle: envia o pulso e cede o laço até o fim do movimento
+        """
+        fim = self.set_angle(angle, bloquear=False)
+        await self.aguardar_async()
+        return fim
+
+    async def aguardar_async(self):
+        """Espera o fim do movimento em andamento sem bloquear o laço do asyncio"""
+        restante = self._fim_movimento - time.monotonic()
+        if restante > 0:
+            await asyncio.sleep(restante)
+
+    @property
+    def em_movimento(self):
+        """True enquanto o movimento estimado ainda não terminou"""
+        return time.monotonic() < self._fim_movimento
 
     @property
     def last_angle(self):
         """Retorna o último ângulo definido"""
-        return self._last_angle
\ No newline at end of file
+        return self._last_angle
+
+
+def aguardar_servos(servos):
+    """Espera até que todos os servos do grupo terminem seus movimentos"""
+    restante = max((s._fim_movimento for s in servos), default=0.0) - time.monotonic()
+    if restante > 0:
+        dormir(restante, "mg90s.movimento")
+
+
+async def aguardar_servos_async(servos):
+    """Versão assíncrona de aguardar_servos"""
+    restante = max((s._fim_movimento for s in servos), default=0.0) - time.monotonic()
+    if restante > 0:
+        await asyncio.sleep(restante)
+
+
+def mover_servos(alvos, bloquear=True):
+    """
+    Move vários servos ao mesmo tempo: alvos = {servo: angulo}
+    Servos do mesmo PCA9685 são atualizados em uma única chamada a set_pwm_multi.
+    Retorna o instante estimado em que o último servo termina o movimento.
+    """
+    por_pca = {}
+    for servo, angle in alvos.items():
+        por_pca.setdefault(servo.pca, {})[servo.channel] = servo.angle_to_duty_cycle(angle)
+    for pca, duty_cycles in por_pca.items():
+        pca.set_pwm_duty_cycle_multi(duty_cycles)
+
+    fim = max((servo._registrar_movimento(angle) for servo, angle in alvos.items()), default=0.0)
+    if bloquear:
+        aguardar_servos(alvos)
+    return fim
+
+
+async def mover_servos_async(alvos):
+    """Versão assíncrona de mover_servos: cede o laço até o último servo terminar"""
+    fim = mover_servos(alvos, bloquear=False)
+    await aguardar_servos_async(alvos)
+    return fim
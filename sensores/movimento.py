@@ -0,0 +1,145 @@
+import math
+import time
+import asyncio
+import numpy as np
+from sensores.instrumentacao import dormir
+from sensores.mg90s import mover_servos, aguardar_servos, aguardar_servos_async
+
+TAXA_QUADROS_PADRAO = 50    # Quadros por segundo: um por período do PWM de 50 Hz
+
+
+class SequenciaMovimento:
+    """
+    Declara um movimento de vários servos por quadros-chave, para compilar uma vez
+    e executar quantas vezes for preciso.
+
+    Cada ``mover`` interpola do quadro-chave anterior até os novos ângulos, com a
+    duração que o servo mais lento do passo leva (``velocidade`` e ``atraso`` do
+    MG90S), em vez de passos fixos de alguns graus com uma espera a cada um.
+
+    Args:
+        inicio (dict): Pose inicial {servo: angulo}, com todos os servos usados
+        taxa_quadros (float): Quadros por segundo na execução
+
+    Example:
+        >>> sequencia = SequenciaMovimento({base: 130, braco: 50, garra: 0})
+        >>> sequencia.mover({braco: 110})       # Abaixa
+        >>> sequencia.mover({garra: 25})        # Fecha
+        >>> sequencia.mover({braco: 50, base: 5})
+        >>> movimento = sequencia.compilar()
+        >>> movimento.executar()
+    """
+
+    def __init__(self, inicio, taxa_quadros=TAXA_QUADROS_PADRAO):
+        self.inicio = {servo: max(0, min(180, angulo)) for servo, angulo in inicio.items()}
+        self.servos = list(self.inicio)
+        self.taxa_quadros = taxa_quadros
+        self._passos = []           # (alvos, duração em s)
+
+    def mover(self, alvos, duracao=None):
+        """
+        Acrescenta um quadro-chave: alvos = {servo: angulo}
+        duracao -> segundos até chegar nos alvos (padrão: o tempo do servo mais lento)
+        """
+        for servo in alvos:
+            if servo not in self.inicio:
+                raise ValueError(f"Servo do canal {servo.channel} não está na pose inicial.")
+        self._passos.append(({s: max(0, min(180, a)) for s, a in alvos.items()}, duracao))
+        return self
+
+    def pausa(self, segundos):
+        """Mantém a pose atual por alguns segundos"""
+        self._passos.append(({}, segundos))
+        return self
+
+    def compilar(self):
+        """Interpola os quadros-chave e converte cada quadro em valores OFF de 12 bits"""
+        pose = np.array([self.inicio[s] for s in self.servos], dtype=np.float64)
+        trechos = []
+        for alvos, duracao in self._passos:
+            destino = pose.copy()
+            for servo, angulo in alvos.items():
+                destino[self.servos.index(servo)] = angulo
+            if duracao is None:
+                duracao = max((s.atraso + abs(destino[i] - pose[i]) / s.velocidade
+                               for i, s in enumerate(self.servos) if destino[i] != pose[i]), default=0.0)
+            n = max(1, math.ceil(duracao * self.taxa_quadros - 1e-9))
+            fracao = np.arange(1, n + 1)[:, None] / n
+            trechos.append(pose + (destino - pose) * fracao)
+            pose = destino
+        angulos = np.vstack(trechos) if trechos else np.empty((0, len(self.servos)))
+        return MovimentoCompilado(self.inicio, self.servos, angulos, 1.0 / self.taxa_quadros)
+
+
+class MovimentoCompilado:
+    """
+    Movimento pronto para executar: uma tabela de valores OFF do PCA9685 por quadro.
+
+    Na execução, o único trabalho por quadro é esperar o instante do quadro e
+    fazer uma escrita multicanal por PCA9685, só com os canais que mudaram. Canais
+    não consecutivos (ex.: 0, 4 e 12) saem em blocos de uma mesma transação
+    combinada, então cada quadro custa uma transação por PCA9685.
+
+    Atributos:
+        angulos (numpy.ndarray): (quadros, servos) ângulos interpolados
+        tabela (numpy.ndarray): (quadros, servos) uint16 com os valores OFF
+        periodo (float): Intervalo entre quadros (s)
+    """
+
+    def __init__(self, inicio, servos, angulos, periodo):
+        self.inicio = inicio
+        self.servos = servos
+        self.angulos = angulos
+        self.periodo = periodo
+        self.tabela = np.array([[s.pca._duty_para_off(s.angle_to_duty_cycle(a)) for s, a in zip(servos, linha)]
+                                for linha in angulos], dtype=np.uint16).reshape(angulos.shape)
+        # Escritas de cada quadro: [(pca, {canal: (0, off)})], só com os canais alterados
+        anterior = [s.pca._duty_para_off(s.angle_to_duty_cycle(inicio[s])) for s in servos]
+        self._quadros = []
+        for linha in self.tabela.tolist():
+            escritas = {}
+            for i, (servo, off) in enumerate(zip(servos, linha)):
+                if off != anterior[i]:
+                    escritas.setdefault(servo.pca, {})[servo.channel] = (0, off)
+                    anterior[i] = off
+            self._quadros.append(list(escritas.items()))
+
+    @property
+    def duracao(self):
+        """Duração da parte interpolada (s), sem a ida até a pose inicial"""
+        return len(self._quadros) * self.periodo
+
+    def _concluir(self):
+        """Atualiza a posição conhecida dos servos com a pose final"""
+        agora = time.monotonic()
+        final = self.angulos[-1] if len(self.angulos) else [self.inicio[s] for s in self.servos]
+        for servo, angulo in zip(self.servos, final):
+            servo._last_angle = float(angulo)
+            servo._fim_movimento = agora + servo.atraso
+
+    def executar(self):
+        """Vai até a pose inicial e reproduz os quadros em instantes fixos"""
+        mover_servos(self.inicio)
+        inicio = time.monotonic()
+        for i, escritas in enumerate(self._quadros):
+            restante = inicio + i * self.periodo - time.monotonic()
+            if restante > 0:
+                dormir(restante, "movimento.quadro")
+            for pca, valores in escritas:
+                pca.set_pwm_multi(valores)
+        self._concluir()
+        aguardar_servos(self.servos)
+
+    async def executar_async(self):
+        """Versão assíncrona de executar: cede o laço entre os quadros"""
+        mover_servos(self.inicio, bloquear=False)
+        await aguardar_servos_async(self.servos)
+        inicio = time.monotonic()
+        for i, escritas in enumerate(self._quadros):
+            restante = inicio + i * self.periodo - time.monotonic()
+            if restante > 0:
+                await asyncio.sleep(restante)
+            for pca, valores in escritas:
+                pca.set_pwm_multi(valores)
+        self._concluir()
+        await aguardar_servos_async(self.servos)
@@ -1,47 +1,99 @@
-from sensores.i2cmodule import I2CModule
-import smbus2
-import time
+from sensores.i2cmodule import I2CModule, I2C_DEVICE
+from sensores.instrumentacao import dormir
+import asyncio
 
 # ===== ENDEREÇOS E CONFIGURAÇÕES =====
 PCA9685_ADDR = 0x40      # Endereço I2C do módulo PCA9685 (padrão)
+NUM_CANAIS = 16          # Quantidade de canais PWM do PCA9685
+CANAIS_POR_BLOCO = 8     # Uma escrita em bloco SMBus leva até 32 bytes = 8 canais
 
 class PCA9685(I2CModule):
     # Registradores importantes do PCA9685
     __MODE1 = 0x00        # Registrador de controle principal (MODE1)
     __PRESCALE = 0xFE     # Registrador para configurar frequência PWM
     __LED0_ON_L = 0x06    # Endereço do primeiro registrador do canal 0
+    __ALL_LED_ON_L = 0xFA # Registradores que escrevem em todos os canais de uma vez
+    __MODE1_AI = 0x20     # Bit de auto-incremento (necessário para escritas em bloco)
 
-    def __init__(self, mux_channel=0):
+    def __init__(self, mux_channel=0, barramento=I2C_DEVICE):
         """
         Inicializa o PCA9685
+        barramento -> número do adaptador I2C (/dev/i2c-N)
         """
-        super().__init__(PCA9685_ADDR, mux_channel)
+        super().__init__(PCA9685_ADDR, mux_channel, barramento)
+        # Cópia local dos registradores: evita reescrever valores que não mudaram
+        self._pwm = [None] * NUM_CANAIS     # (on, off) de cada canal, None = desconhecido
+        self._prescale = None
         self.reset()                         # Reseta PCA9685 para estado padrão
 
     def reset(self):
         """
-        Reseta o PCA9685 para o modo padrão
+        Reseta o PCA9685 para o modo padrão (com auto-incremento habilitado)
         """
-        self.bus.write_byte_data(self.address, self.__MODE1, 0x00)
-        time.sleep(0.01) 
+        self._escrever_mode1_padrao()
+        dormir(0.01, "pca9685.reset")
+
+    async def reset_async(self):
+        """Versão assíncrona de reset (não bloqueia o laço durante a espera)"""
+        self._escrever_mode1_padrao()
+        await asyncio.sleep(0.01)
+
+    def _escrever_mode1_padrao(self):
+        """Escreve MODE1 com auto-incremento e atualiza a cópia local"""
+        self._escrever_byte(self.__MODE1, self.__MODE1_AI)
+        self._mode1 = self.__MODE1_AI
+
+    def invalidar_cache(self):
+        """Esquece a cópia local dos registradores (use se outro programa alterou o chip)"""
+        self._pwm = [None] * NUM_CANAIS
+        self._prescale = None
+        self._mode1 = None
 
     def set_pwm_freq(self, freq_hz):
         """
         Configura a frequência do PWM para todos os canais
+        Não faz nada se a frequência pedida já estiver configurada.
         """
+        prescale = self._calcular_prescale(freq_hz)
+        if prescale == self._prescale:
+            return
+        old_mode = self._escrever_prescale(prescale)
+        dormir(0.005, "pca9685.oscilador")
+        self._reiniciar_pwm(old_mode, prescale)
+
+    async def set_pwm_freq_async(self, freq_hz):
+        """Versão assíncrona de set_pwm_freq (não bloqueia o laço durante a espera)"""
+        prescale = self._calcular_prescale(freq_hz)
+        if prescale == self._prescale:
+            return
+        old_mode = self._escrever_prescale(prescale)
+        await asyncio.sleep(0.005)
+        self._reiniciar_pwm(old_mode, prescale)
+
+    @staticmethod
+    def _calcular_prescale(freq_hz):
         # Fórmula: prescale = round(25MHz / (4096 * freq)) - 1
         prescaleval = 25000000.0 / 4096.0 / float(freq_hz) - 1.0
-        prescale = int(prescaleval + 0.5)
+        return int(prescaleval + 0.5)
 
+    def _escrever_prescale(self, prescale):
+        """Coloca o chip em sleep, grava o prescale e acorda; retorna o MODE1 anterior"""
         # Para alterar prescale é necessário colocar o PCA9685 em sleep
-        old_mode = self.bus.read_byte_data(self.address, self.__MODE1)
+        old_mode = self._mode1
+        if old_mode is None:
+            old_mode = self._ler_byte(self.__MODE1)
         new_mode = (old_mode & 0x7F) | 0x10  # Ativa bit de SLEEP
-        self.bus.write_byte_data(self.address, self.__MODE1, new_mode)
-        self.bus.write_byte_data(self.address, self.__PRESCALE, prescale)  # Escreve novo prescale
-        self.bus.write_byte_data(self.address, self.__MODE1, old_mode)     # Sai do modo sleep
-        time.sleep(0.005)
+        self._escrever_byte(self.__MODE1, new_mode)
+        self._escrever_byte(self.__PRESCALE, prescale)  # Escreve novo prescale
+        self._escrever_byte(self.__MODE1, old_mode)     # Sai do modo sleep
+        return old_mode
+
+    def _reiniciar_pwm(self, old_mode, prescale):
+        """Chamado após o oscilador estabilizar (>= 500 us depois de sair do sleep)"""
         # Ativa auto-incremento e reinicia contadores para aplicar nova frequência
-        self.bus.write_byte_data(self.address, self.__MODE1, old_mode | 0xA1)
+        self._escrever_byte(self.__MODE1, old_mode | 0xA1)
+        self._mode1 = (old_mode | 0x21) & 0x7F          # O bit RESTART volta a 0 sozinho
+        self._prescale = prescale
 
     def set_pwm(self, channel, on, off):
         """
@@ -49,17 +101,63 @@ class PCA9685(I2CModule):
         on  -> valor de início do pulso (0-4095)
         off -> valor de término do pulso (0-4095)
         """
-        reg = self.__LED0_ON_L + 4 * channel  # Calcula endereço do registrador do canal
-        # Escreve os 4 registradores: ON_L, ON_H, OFF_L, OFF_H
-        self.bus.write_byte_data(self.address, reg, on & 0xFF)
-        self.bus.write_byte_data(self.address, reg + 1, on >> 8)
-        self.bus.write_byte_data(self.address, reg + 2, off & 0xFF)
-        self.bus.write_byte_data(self.address, reg + 3, off >> 8)
+        self.set_pwm_multi({channel: (on, off)})
+
+    def set_pwm_multi(self, valores):
+        """
+        Configura vários canais de uma vez: valores = {canal: (on, off)}
+        Canais inalterados são ignorados e canais consecutivos são escritos juntos
+        em um bloco, aproveitando o auto-incremento dos registradores. Blocos de
+        canais não consecutivos (ex.: 0, 4 e 12) vão na mesma transação combinada.
+        """
+        alterados = sorted(c for c, v in valores.items() if self._pwm[c] != tuple(v))
+
+        # Agrupa canais consecutivos em blocos de até CANAIS_POR_BLOCO
+        blocos = []
+        for canal in alterados:
+            bloco = blocos[-1] if blocos else None
+            if bloco and canal == bloco[-1] + 1 and len(bloco) < CANAIS_POR_BLOCO:
+                bloco.append(canal)
+            else:
+                blocos.append([canal])
+
+        escritas = []
+        for bloco in blocos:
+            dados = []
+            for canal in bloco:
+                on, off = valores[canal]
+                # ON_L, ON_H, OFF_L, OFF_H de cada canal
+                dados += [on & 0xFF, on >> 8, off & 0xFF, off >> 8]
+            escritas.append((self.__LED0_ON_L + 4 * bloco[0], dados))
+        if escritas:
+            self._escrever_registradores(escritas)
+        for canal in alterados:
+            self._pwm[canal] = tuple(valores[canal])
+
+    def set_pwm_all(self, on, off):
+        """
+        Configura os mesmos valores ON e OFF em todos os canais (registradores ALL_LED)
+        """
+        if all(v == (on, off) for v in self._pwm):
+            return
+        self._escrever_bloco(self.__ALL_LED_ON_L, [on & 0xFF, on >> 8, off & 0xFF, off >> 8])
+        self._pwm = [(on, off)] * NUM_CANAIS
+
+    @staticmethod
+    def _duty_para_off(duty_cycle):
+        """Converte duty cycle (0.0 a 1.0) para o valor OFF de 12 bits"""
+        duty_cycle = max(0.0, min(1.0, duty_cycle))  # Garante intervalo válido
+        return int(duty_cycle * 4095)                # Converte fração para valor 12-bit
 
     def set_pwm_duty_cycle(self, channel, duty_cycle):
         """
         Configura duty cycle de forma simplificada (0.0 a 1.0)
         """
-        duty_cycle = max(0.0, min(1.0, duty_cycle))  # Garante intervalo válido
-        off_value = int(duty_cycle * 4095)           # Converte fração para valor 12-bit
-        self.set_pwm(channel, 0, off_value)          # Pulso começa em 0 e termina em off_value
\ No newline at end of file
+        off_value = self._duty_para_off(duty_cycle)
+        self.set_pwm(channel, 0, off_value)          # Pulso começa em 0 e termina em off_value
+
+    def set_pwm_duty_cycle_multi(self, duty_cycles):
+        """
+        Configura o duty cycle de vários canais: duty_cycles = {canal: duty}
+        """
+        self.set_pwm_multi({c: (0, self._duty_para_off(d)) for c, d in duty_cycles.items()})
@@ -0,0 +1,197 @@
+import queue
+import threading
+import time
+from sensores.instrumentacao import Histograma
+
+ETAPAS = ("detectar", "classificar", "atuar")
+_FIM = object()     # Marca de fim que atravessa as filas
+
+
+class Item:
+    """Um objeto na linha: leitura da detecção, classe e instantes de cada etapa"""
+
+    __slots__ = ("numero", "leitura", "classe", "inicio", "fim")
+
+    def __init__(self, numero, leitura):
+        self.numero = numero
+        self.leitura = leitura
+        self.classe = None
+        self.inicio = time.monotonic()
+        self.fim = None
+
+
+class PipelineSeparacao:
+    """
+    Laço de separação em três etapas, cada uma na sua thread, ligadas por filas limitadas.
+
+    ``detectar`` espera o próximo objeto e retorna a leitura dele (None encerra);
+    ``classificar`` transforma a leitura em uma classe; ``atuar`` executa o
+    movimento para a classe. Enquanto o braço ainda move o item N, o item N+1 já
+    é detectado e classificado. As filas limitadas seguram a detecção quando o
+    braço fica para trás, em vez de acumular objetos sem limite.
+
+    Args:
+        detectar (callable): () -> leitura, ou None para encerrar
+        classificar (callable): leitura -> classe
+        atuar (callable): classe -> None
+        tamanho_fila (int): Itens esperando entre duas etapas
+
+    Example:
+        >>> sensor = TCS34725(canal_mux=Porta.I2C2)
+        >>> pipeline = PipelineSeparacao(sensor.ler_cores, sensor.nome_cor, separar)
+        >>> pipeline.executar(itens=10)
+        >>> print(pipeline.estatisticas()["itens_por_minuto"])
+    """
+
+    def __init__(self, detectar, classificar, atuar, tamanho_fila=1):
+        self._funcoes = {"detectar": detectar, "classificar": classificar, "atuar": atuar}
+        self._filas = [queue.Queue(maxsize=tamanho_fila) for _ in range(2)]
+        self._latencias = {etapa: Histograma() for etapa in ETAPAS}
+        self._total = Histograma()          # Da detecção ao fim da atuação
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self._threads = []
+        self._erro = None
+        self._itens = None                  # Limite de itens da execução atual
+        self.concluidos = 0
+        self._primeiro = None               # Início do primeiro item concluído
+        self._ultimo = None                 # Fim do último item concluído
+
+    # ----- ETAPAS -----
+    def _medir(self, etapa, *args):
+        inicio = time.monotonic()
+        resultado = self._funcoes[etapa](*args)
+        duracao = time.monotonic() - inicio
+        with self._lock:
+            self._latencias[etapa].registrar(duracao)
+        return resultado
+
+    def _colocar(self, fila, item):
+        """Coloca na fila, desistindo se o pipeline for parado enquanto ela estiver cheia"""
+        while not self._parar.is_set():
+            try:
+                fila.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _executar_etapa(self, etapa):
+        try:
+            if etapa == "detectar":
+                numero = 0
+                while not self._parar.is_set() and (self._itens is None or numero < self._itens):
+                    leitura = self._medir("detectar")
+                    if leitura is None:
+                        break
+                    if not self._colocar(self._filas[0], Item(numero, leitura)):
+                        return
+                    numero += 1
+                self._colocar(self._filas[0], _FIM)
+                return
+            entrada = self._filas[0] if etapa == "classificar" else self._filas[1]
+            while True:
+                item = entrada.get()
+                if item is _FIM or self._parar.is_set():
+                    if etapa == "classificar":
+                        self._colocar(self._filas[1], _FIM)
+                    return
+                if etapa == "classificar":
+                    item.classe = self._medir("classificar", item.leitura)
+                    if not self._colocar(self._filas[1], item):
+                        return
+                else:
+                    self._medir("atuar", item.classe)
+                    self._concluir(item)
+        except BaseException as erro:
+            self._erro = erro
+            self._parar.set()
+            for fila in self._filas:     # Acorda quem espera nas filas
+                try:
+                    fila.put_nowait(_FIM)
+                except queue.Full:
+                    pass
+
+    def _concluir(self, item):
+        item.fim = time.monotonic()
+        with self._lock:
+            self._total.registrar(item.fim - item.inicio)
+            self.concluidos += 1
+            if self._primeiro is None:
+                self._primeiro = item.inicio
+            self._ultimo = item.fim
+
+    # ----- CONTROLE -----
+    def iniciar(self, itens=None):
+        """Inicia as três threads; itens -> encerra depois de detectar esse número de objetos"""
+        if self._threads:
+            return
+        self._itens = itens
+        self._parar.clear()
+        self._erro = None
+        self._threads = [threading.Thread(target=self._executar_etapa, args=(etapa,),
+                                          name=f"pipeline-{etapa}", daemon=True) for etapa in ETAPAS]
+        for thread in self._threads:
+            thread.start()
+
+    def aguardar(self):
+        """Espera as etapas terminarem; repassa o erro de uma etapa, se houve"""
+        for thread in reversed(self._threads):
+            # Parado, a detecção pode estar presa esperando um objeto: não espera por ela
+            if thread.name != "pipeline-detectar" or not self._parar.is_set():
+                thread.join()
+        self._threads = []
+        erro, self._erro = self._erro, None
+        if erro is not None:
+            raise erro
+
+    def parar(self):
+        """Para depois da etapa em andamento de cada thread (itens nas filas são descartados)"""
+        self._parar.set()
+        for fila in self._filas:
+            try:
+                fila.put_nowait(_FIM)
+            except queue.Full:
+                pass
+        self.aguardar()
+
+    def executar(self, itens=None):
+        """Roda até a detecção retornar None (ou até `itens` objetos) e espera o último"""
+        self.iniciar(itens)
+        try:
+            self.aguardar()
+        except KeyboardInterrupt:
+            self.parar()
+            raise
+
+    def __enter__(self):
+        self.iniciar()
+        return self
+
+    def __exit__(self, *exc):
+        self.parar()
+
+    # ----- MÉTRICAS -----
+    def estatisticas(self):
+        """
+        Retorna {"itens", "itens_por_minuto", "total": resumo, "etapas": {etapa: resumo}}
+        Os resumos são os de instrumentacao.Histograma (em s).
+        """
+        with self._lock:
+            duracao = (self._ultimo - self._primeiro) if self.concluidos else 0.0
+            return {
+                "itens": self.concluidos,
+                "itens_por_minuto": 60.0 * self.concluidos / duracao if duracao > 0 else 0.0,
+                "total": self._total.resumo(),
+                "etapas": {etapa: h.resumo() for etapa, h in self._latencias.items()},
+            }
+
+    def relatorio(self):
+        """Texto com itens por minuto e a latência média e p90 de cada etapa"""
+        dados = self.estatisticas()
+        linhas = [f"{dados['itens']} itens, {dados['itens_por_minuto']:.1f} itens/min"]
+        for nome, resumo in list(dados["etapas"].items()) + [("total", dados["total"])]:
+            if resumo["contagem"]:
+                linhas.append(f"  {nome:12} média {resumo['media'] * 1000:8.1f} ms   "
+                              f"p90 {resumo['p90'] * 1000:8.1f} ms")
+        return "\n".join(linhas)
@@ -0,0 +1,228 @@
+import glob
+import json
+import os
+import struct
+import threading
+import time
+import numpy as np
+
+# Arquivo de bloco: cabeçalho fixo (mágico, linhas gravadas, capacidade em linhas,
+# tamanho da descrição), descrição JSON das colunas e, a partir de um offset
+# alinhado, cada coluna contígua com espaço para `capacidade` valores.
+MAGICO = b"SNSCOL1\n"
+CABECALHO = struct.Struct("<8sQQI")
+OFFSET_LINHAS = 8
+ALINHAMENTO = 64
+EXTENSAO = ".col"
+
+# Fluxo -> colunas (nome, dtype). "tempo" é o instante em segundos desde a época.
+FLUXOS = {
+    "cores": [("tempo", "<f8"), ("canal", "u1"), ("r", "<u2"), ("g", "<u2"), ("b", "<u2"), ("c", "<u2")],
+    "distancia": [("tempo", "<f8"), ("canal", "u1"), ("distancia", "<i4")],
+    "botoes": [("tempo", "<f8"), ("porta", "<u2"), ("apertado", "u1")],    # porta: offset da linha GPIO
+}
+
+
+def _alinhar(valor):
+    return -(-valor // ALINHAMENTO) * ALINHAMENTO
+
+
+class _Fluxo:
+    """Colunas de um fluxo: buffer em memória e o arquivo de bloco atual"""
+
+    def __init__(self, diretorio, nome, colunas, tamanho_arquivo, lote):
+        self.diretorio = diretorio
+        self.nome = nome
+        self.colunas = [(coluna, np.dtype(tipo)) for coluna, tipo in colunas]
+        self.tamanho_arquivo = tamanho_arquivo
+        self.buffer = {coluna: np.zeros(lote, dtype=tipo) for coluna, tipo in self.colunas}
+        self.pendentes = 0          # Linhas no buffer ainda não gravadas
+        self.descricao = json.dumps({"fluxo": nome, "colunas": [[c, t.str] for c, t in self.colunas]}).encode()
+        inicio = _alinhar(CABECALHO.size + len(self.descricao))
+        largura = sum(t.itemsize for _, t in self.colunas)
+        # Capacidade com folga para o alinhamento de cada coluna
+        self.capacidade = max(1, (tamanho_arquivo - inicio - ALINHAMENTO * len(self.colunas)) // largura)
+        self.offsets = []
+        for _, tipo in self.colunas:
+            self.offsets.append(inicio)
+            inicio = _alinhar(inicio + self.capacidade * tipo.itemsize)
+        self.tamanho_bloco = inicio
+        existentes = arquivos(diretorio, nome)
+        self.sequencia = int(existentes[-1][-len(EXTENSAO) - 6:-len(EXTENSAO)]) + 1 if existentes else 0
+        self.fd = None
+        self.linhas = 0             # Linhas já gravadas no bloco atual
+
+    def _novo_bloco(self):
+        """Fecha o bloco atual e cria o próximo, já com o tamanho final"""
+        self.fechar()
+        caminho = os.path.join(self.diretorio, f"{self.nome}-{self.sequencia:06d}{EXTENSAO}")
+        self.sequencia += 1
+        self.fd = os.open(caminho, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        os.ftruncate(self.fd, self.tamanho_bloco)
+        os.pwrite(self.fd, CABECALHO.pack(MAGICO, 0, self.capacidade, len(self.descricao)) + self.descricao, 0)
+        self.linhas = 0
+
+    def descarregar(self):
+        """Grava as linhas do buffer, coluna a coluna, trocando de bloco quando encher"""
+        feitas = 0
+        while feitas < self.pendentes:
+            if self.fd is None or self.linhas == self.capacidade:
+                self._novo_bloco()
+            n = min(self.pendentes - feitas, self.capacidade - self.linhas)
+            for (coluna, tipo), offset in zip(self.colunas, self.offsets):
+                os.pwrite(self.fd, self.buffer[coluna][feitas:feitas + n].tobytes(),
+                          offset + self.linhas * tipo.itemsize)
+            self.linhas += n
+            feitas += n
+            # O contador só avança depois dos dados: um leitor nunca vê linhas incompletas
+            os.pwrite(self.fd, struct.pack("<Q", self.linhas), OFFSET_LINHAS)
+        self.pendentes = 0
+
+    def fechar(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class Registrador:
+    """
+    Grava leituras de cor, distância e eventos de botão em colunas tipadas no disco.
+
+    Cada fluxo ("cores", "distancia", "botoes") vai para arquivos de bloco de
+    tamanho fixo no diretório: ao encher um bloco, o próximo é criado (rotação
+    por tamanho). Dentro do bloco cada coluna é um array contíguo de largura
+    fixa, então a leitura com ``abrir_bloco`` é só um mapa de memória, sem
+    interpretar nada. As leituras se acumulam em buffers NumPy e são gravadas
+    em lote a cada ``lote`` linhas (ou em ``descarregar``/``fechar``).
+
+    Args:
+        diretorio (str): Onde ficam os arquivos (criado se não existir)
+        tamanho_arquivo (int): Tamanho de cada bloco em bytes
+        lote (int): Linhas acumuladas em memória antes de gravar
+
+    Example:
+        >>> with Registrador("auditoria") as registro:
+        ...     registro.registrar_cores(sensor_cor, sensor_cor.ler_cores())
+        ...     registro.registrar_distancia(sensor_dist, sensor_dist.ler_distancia())
+        ...     botao.ao_evento(registro.registrar_evento)
+    """
+
+    def __init__(self, diretorio, tamanho_arquivo=64 << 20, lote=4096):
+        os.makedirs(diretorio, exist_ok=True)
+        self.diretorio = diretorio
+        self.lote = lote
+        self._fluxos = {nome: _Fluxo(diretorio, nome, colunas, tamanho_arquivo, lote)
+                        for nome, colunas in FLUXOS.items()}
+        self._lock = threading.Lock()
+        # Converte instantes de time.monotonic (Amostrador, eventos) em segundos desde a época
+        self._deslocamento = time.time() - time.monotonic()
+
+    def _adicionar(self, nome, valores):
+        with self._lock:
+            fluxo = self._fluxos[nome]
+            i = fluxo.pendentes
+            for (coluna, _), valor in zip(fluxo.colunas, valores):
+                fluxo.buffer[coluna][i] = valor
+            fluxo.pendentes += 1
+            if fluxo.pendentes == self.lote:
+                fluxo.descarregar()
+
+    def registrar_cores(self, sensor, amostra, tempo=None):
+        """Registra uma leitura (R, G, B, C) de um TCS34725; tempo em s desde a época (padrão: agora)"""
+        r, g, b, c = amostra
+        self._adicionar("cores", (time.time() if tempo is None else tempo, sensor.canal_mux, r, g, b, c))
+
+    def registrar_distancia(self, sensor, distancia, tempo=None):
+        """Registra uma distância (mm) de um VL53L0X; tempo em s desde a época (padrão: agora)"""
+        self._adicionar("distancia", (time.time() if tempo is None else tempo, sensor.canal_mux, distancia))
+
+    def registrar_evento(self, evento):
+        """
+        Registra um EventoBotao (pode ser passado direto para Botao.ao_evento)
+
+        Example:
+            >>> with Registrador(diretorio) as registro:
+            ...     registro.registrar_evento(EventoBotao(Porta.P2, True, time.monotonic_ns()))
+            >>> next(ler_fluxo(diretorio, "botoes"))["porta"].tolist()
+            [266]
+        """
+        tempo = self._deslocamento + evento.timestamp_ns / 1e9
+        self._adicionar("botoes", (tempo, evento.porta, evento.apertado))
+
+    def registrar_lote(self, sensor, tempos, dados):
+        """
+        Registra um lote do Amostrador/BufferCircular de uma vez
+        tempos -> instantes em time.monotonic; dados -> array (n, canais) do sensor
+        """
+        nome = "cores" if sensor.CANAIS_AMOSTRA == 4 else "distancia"
+        dados = np.asarray(dados).reshape(len(tempos), -1)
+        with self._lock:
+            fluxo = self._fluxos[nome]
+            feitas = 0
+            while feitas < len(tempos):
+                i = fluxo.pendentes
+                n = min(len(tempos) - feitas, self.lote - i)
+                fim = feitas + n
+                colunas = fluxo.buffer
+                np.add(tempos[feitas:fim], self._deslocamento, out=colunas["tempo"][i:i + n])
+                colunas["canal"][i:i + n] = sensor.canal_mux
+                for j, (coluna, _) in enumerate(fluxo.colunas[2:]):
+                    colunas[coluna][i:i + n] = dados[feitas:fim, j]
+                fluxo.pendentes += n
+                feitas = fim
+                if fluxo.pendentes == self.lote:
+                    fluxo.descarregar()
+
+    def descarregar(self):
+        """Grava agora tudo o que está em memória"""
+        with self._lock:
+            for fluxo in self._fluxos.values():
+                fluxo.descarregar()
+
+    def fechar(self):
+        """Grava o que falta e fecha os arquivos"""
+        with self._lock:
+            for fluxo in self._fluxos.values():
+                fluxo.descarregar()
+                fluxo.fechar()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+
+# ===================== LEITURA =====================
+
+def arquivos(diretorio, fluxo):
+    """Arquivos de bloco de um fluxo, em ordem de gravação"""
+    return sorted(glob.glob(os.path.join(glob.escape(diretorio), f"{fluxo}-[0-9][0-9][0-9][0-9][0-9][0-9]{EXTENSAO}")))
+
+
+def abrir_bloco(caminho):
+    """
+    Mapeia um arquivo de bloco e retorna {coluna: array} com as linhas gravadas
+    Os arrays são np.memmap somente leitura: nada é copiado nem interpretado.
+    """
+    with open(caminho, "rb") as arquivo:
+        magico, linhas, capacidade, tamanho = CABECALHO.unpack(arquivo.read(CABECALHO.size))
+        if magico != MAGICO:
+            raise ValueError(f"{caminho} não é um arquivo do Registrador.")
+        descricao = json.loads(arquivo.read(tamanho))
+    colunas = {}
+    offset = _alinhar(CABECALHO.size + tamanho)
+    for coluna, tipo in descricao["colunas"]:
+        tipo = np.dtype(tipo)
+        if linhas:
+            colunas[coluna] = np.memmap(caminho, dtype=tipo, mode="r", offset=offset, shape=(linhas,))
+        else:
+            colunas[coluna] = np.empty(0, dtype=tipo)
+        offset = _alinhar(offset + capacidade * tipo.itemsize)
+    return colunas
+
+
+def ler_fluxo(diretorio, fluxo):
+    """Gerador de blocos ({coluna: array}) de um fluxo, do mais antigo ao mais novo"""
+    for caminho in arquivos(diretorio, fluxo):
+        yield abrir_bloco(caminho)
@@ -0,0 +1,598 @@
+import ctypes
+import enum
+import errno
+import os
+import random
+import select
+import threading
+import time
+from collections import deque, namedtuple
+from types import SimpleNamespace
+
+from sensores.i2cmodule import TCA9548A_ADDR
+from sensores.vl53l0x import (decodificar_sequencia, orcamento_us, timeout_final,
+                              CUSTO_INICIO_US, CUSTO_INICIO_DEFINIR_US)
+
+I2C_M_RD = 0x0001       # Flag de leitura de uma mensagem de i2c_rdwr
+
+
+# ===================== BARRAMENTO I2C =====================
+
+class BarramentoSimulado:
+    """
+    Barramento I2C simulado com a mesma interface usada de ``smbus2.SMBus``.
+
+    Os dispositivos simulados são ligados a canais de um TCA9548A simulado (ou
+    direto no barramento) e respondem pelo mapa de registradores. Cada transação
+    é contabilizada (quantidade, bytes e tempo de barramento no clock
+    configurado), o que permite medir o custo de cada leitura sem hardware.
+
+    Args:
+        clock_hz (int): Clock do barramento (100_000 ou 400_000)
+        tempo_real (bool): Se True, cada transação espera o tempo que levaria no fio
+
+    Example:
+        >>> from sensores.i2cmodule import definir_backend
+        >>> sim = BarramentoSimulado(clock_hz=400_000)
+        >>> sim.conectar(TCS34725Simulado(cor=(300, 250, 200, 800)), canal=1)
+        >>> definir_backend(lambda numero: sim)
+        >>> sensor = TCS34725(canal_mux=1)
+    """
+
+    BITS_START_STOP = 2     # Condições de START/STOP (ou repeated START) por mensagem
+
+    def __init__(self, clock_hz=100_000, tempo_real=False):
+        self.clock_hz = clock_hz
+        self.tempo_real = tempo_real
+        self.mux = TCA9548ASimulado()
+        self.dispositivos = {}      # (canal ou None, endereço) -> dispositivo
+        self.zerar_estatisticas()
+
+    def conectar(self, dispositivo, canal=None):
+        """Liga um dispositivo a um canal do mux (canal=None: direto no barramento)"""
+        self.dispositivos[(canal, dispositivo.endereco)] = dispositivo
+        return dispositivo
+
+    def zerar_estatisticas(self):
+        self.transacoes = 0
+        self.bytes = 0
+        self.tempo_barramento = 0.0
+        self.por_endereco = {}      # endereço -> [transações, bytes]
+
+    # ----- ROTEAMENTO E TEMPO -----
+    def _dispositivo(self, endereco):
+        """Encontra quem responde no endereço, considerando os canais ativos do mux"""
+        if endereco == self.mux.endereco:
+            return self.mux
+        dispositivo = self.dispositivos.get((None, endereco))
+        if dispositivo is not None:
+            return dispositivo
+        for canal in range(8):
+            if self.mux.controle & (1 << canal):
+                dispositivo = self.dispositivos.get((canal, endereco))
+                if dispositivo is not None:
+                    return dispositivo
+        raise OSError(errno.EREMOTEIO, f"Nenhum dispositivo respondeu em {hex(endereco)}")
+
+    def _contabilizar(self, endereco, mensagens, nbytes):
+        """Registra uma transação com `mensagens` partes e `nbytes` no fio (com endereços)"""
+        duracao = (nbytes * 9 + mensagens * self.BITS_START_STOP) / self.clock_hz
+        self.transacoes += 1
+        self.bytes += nbytes
+        self.tempo_barramento += duracao
+        contagem = self.por_endereco.setdefault(endereco, [0, 0])
+        contagem[0] += 1
+        contagem[1] += nbytes
+        if self.tempo_real:
+            time.sleep(duracao)
+
+    # ----- INTERFACE SMBus -----
+    def write_byte(self, endereco, valor):
+        self._contabilizar(endereco, 1, 2)
+        self._dispositivo(endereco).escrever([valor])
+
+    def read_byte(self, endereco):
+        self._contabilizar(endereco, 1, 2)
+        return self._dispositivo(endereco).ler(1)[0]
+
+    def write_byte_data(self, endereco, reg, valor):
+        self._contabilizar(endereco, 1, 3)
+        self._dispositivo(endereco).escrever([reg, valor])
+
+    def read_byte_data(self, endereco, reg):
+        self._contabilizar(endereco, 2, 4)
+        dispositivo = self._dispositivo(endereco)
+        dispositivo.escrever([reg])
+        return dispositivo.ler(1)[0]
+
+    def write_i2c_block_data(self, endereco, reg, dados):
+        self._contabilizar(endereco, 1, 2 + len(dados))
+        self._dispositivo(endereco).escrever([reg] + list(dados))
+
+    def read_i2c_block_data(self, endereco, reg, tamanho):
+        self._contabilizar(endereco, 2, 3 + tamanho)
+        dispositivo = self._dispositivo(endereco)
+        dispositivo.escrever([reg])
+        return dispositivo.ler(tamanho)
+
+    def i2c_rdwr(self, *mensagens):
+        """Transação combinada: mensagens smbus2.i2c_msg com repeated start entre elas"""
+        self._contabilizar(mensagens[0].addr, len(mensagens), sum(m.len + 1 for m in mensagens))
+        for mensagem in mensagens:
+            dispositivo = self._dispositivo(mensagem.addr)
+            if mensagem.flags & I2C_M_RD:
+                ctypes.memmove(mensagem.buf, bytes(dispositivo.ler(mensagem.len)), mensagem.len)
+            else:
+                dispositivo.escrever(list(bytes(mensagem)))
+
+    def close(self):
+        pass
+
+
+# ===================== TEMPO =====================
+
+class RelogioVirtual:
+    """
+    Substitui time.sleep/time.monotonic por um relógio que só anda quando mandado
+
+    Dentro do ``with``, dormir avança o relógio na hora em vez de esperar, então
+    os drivers (e uma reprodução de sessão gravada) rodam tão rápido quanto a CPU
+    permite, vendo o mesmo tempo que veriam na placa.
+
+    Example:
+        >>> with RelogioVirtual() as relogio:
+        ...     sensor.ler_distancia()
+        ...     print(relogio.sono)      # Tempo que teria sido gasto dormindo
+    """
+
+    def __init__(self):
+        self.agora = 1000.0
+        self.sono = 0.0
+        self._originais = None
+
+    def sleep(self, segundos):
+        if segundos > 0:
+            self.agora += segundos
+            self.sono += segundos
+
+    def monotonic(self):
+        return self.agora
+
+    def monotonic_ns(self):
+        return int(self.agora * 1e9)
+
+    def __enter__(self):
+        self._originais = (time.sleep, time.monotonic, time.monotonic_ns)
+        time.sleep, time.monotonic, time.monotonic_ns = self.sleep, self.monotonic, self.monotonic_ns
+        return self
+
+    def __exit__(self, *exc):
+        time.sleep, time.monotonic, time.monotonic_ns = self._originais
+
+
+# ===================== DISPOSITIVOS =====================
+
+class DispositivoSimulado:
+    """
+    Base dos dispositivos simulados: 256 registradores de 8 bits e um ponteiro.
+
+    Uma escrita começa pelo endereço do registrador e segue escrevendo nos
+    seguintes; uma leitura parte do ponteiro atual. Subclasses ajustam a
+    decodificação do ponteiro, o auto-incremento e o efeito de cada registrador.
+    """
+
+    endereco = None
+
+    def __init__(self):
+        self.registradores = bytearray(256)
+        self.ponteiro = 0
+
+    def _decodificar_ponteiro(self, byte):
+        """Converte o primeiro byte de uma escrita em endereço de registrador"""
+        return byte
+
+    def _auto_incremento(self):
+        return True
+
+    def escrever(self, dados):
+        self.ponteiro = self._decodificar_ponteiro(dados[0])
+        for valor in dados[1:]:
+            self._escrever_registrador(self.ponteiro, valor & 0xFF)
+            if self._auto_incremento():
+                self.ponteiro = (self.ponteiro + 1) & 0xFF
+
+    def ler(self, tamanho):
+        dados = []
+        for _ in range(tamanho):
+            dados.append(self._ler_registrador(self.ponteiro))
+            if self._auto_incremento():
+                self.ponteiro = (self.ponteiro + 1) & 0xFF
+        return dados
+
+    def _escrever_registrador(self, reg, valor):
+        self.registradores[reg] = valor
+
+    def _ler_registrador(self, reg):
+        return self.registradores[reg]
+
+
+class TCA9548ASimulado(DispositivoSimulado):
+    """Multiplexador: um único registrador de controle, um bit por canal"""
+
+    endereco = TCA9548A_ADDR
+
+    def __init__(self):
+        super().__init__()
+        self.controle = 0
+
+    def escrever(self, dados):
+        self.controle = dados[-1] & 0xFF
+
+    def ler(self, tamanho):
+        return [self.controle] * tamanho
+
+
+class TCS34725Simulado(DispositivoSimulado):
+    """
+    Sensor de cor: integra continuamente enquanto PON+AEN estão ligados.
+
+    ``cor`` são as contagens (R, G, B, C) com ganho 4x e integração de 24 ms;
+    as contagens seguem o ganho e o ATIME configurados e saturam como no chip.
+    Os registradores de dados só mudam ao fim de cada ciclo de integração; ao
+    ligar AEN, o primeiro ciclo só começa depois da inicialização de 2,4 ms, e
+    até lá os registradores mantêm os dados da configuração anterior.
+
+    Args:
+        cor (tuple): Contagens (R, G, B, C) de referência
+        ruido (float): Desvio padrão relativo do ruído de cada leitura
+        semente (int): Semente do gerador de ruído
+    """
+
+    endereco = 0x29
+    _GANHOS = (1, 4, 16, 60)
+    TEMPO_INICIALIZACAO = 0.0024    # Inicialização do RGBC entre AEN e o primeiro ciclo
+
+    def __init__(self, cor=(300, 250, 200, 800), ruido=0.0, semente=0):
+        super().__init__()
+        self.cor = cor
+        self.ruido = ruido
+        self._aleatorio = random.Random(semente)
+        self.registradores[0x01] = 0xFF     # ATIME
+        self.registradores[0x12] = 0x44     # ID do TCS34725
+        self._inicio = None                 # Instante em que o primeiro ciclo começou
+        self._ciclo = -1                    # Último ciclo de integração publicado
+
+    def _decodificar_ponteiro(self, byte):
+        self._tipo = (byte >> 5) & 0x03     # 00 = byte repetido, 01 = auto-incremento
+        return byte & 0x1F
+
+    def _escrever_registrador(self, reg, valor):
+        super()._escrever_registrador(reg, valor)
+        if reg == 0x00:
+            self._inicio = time.monotonic() + self.TEMPO_INICIALIZACAO if (valor & 0x03) == 0x03 else None
+            self._ciclo = -1
+            self.registradores[0x13] = 0x00
+        elif reg in (0x01, 0x0F) and self._inicio is not None:
+            self._inicio = time.monotonic()  # Nova configuração reinicia a integração
+
+    def _ler_registrador(self, reg):
+        if 0x13 <= reg <= 0x1B:
+            self._atualizar()
+        return self.registradores[reg]
+
+    def tempo_integracao(self):
+        return (256 - self.registradores[0x01]) * 0.0024
+
+    def _atualizar(self):
+        """Publica a leitura do último ciclo de integração concluído"""
+        if self._inicio is None:
+            return
+        ciclo = int((time.monotonic() - self._inicio) / self.tempo_integracao())
+        if ciclo < 1 or ciclo == self._ciclo:
+            return
+        self._ciclo = ciclo
+        ganho = self._GANHOS[self.registradores[0x0F] & 0x03]
+        escala = (ganho / 4) * (self.tempo_integracao() / 0.024)
+        maximo = min(65535, 1024 * (256 - self.registradores[0x01]))
+        r, g, b, c = (self._contagem(v * escala, maximo) for v in self.cor)
+        for i, valor in enumerate((c, r, g, b)):
+            self.registradores[0x14 + 2 * i] = valor & 0xFF
+            self.registradores[0x15 + 2 * i] = valor >> 8
+        self.registradores[0x13] |= 0x01   # AVALID
+
+    def _contagem(self, valor, maximo):
+        if self.ruido:
+            valor *= 1 + self._aleatorio.gauss(0, self.ruido)
+        return max(0, min(maximo, int(round(valor))))
+
+
+class VL53L0XSimulado(DispositivoSimulado):
+    """
+    Sensor de distância com medição única, contínua (back-to-back) e temporizada.
+
+    O bit de início de SYSRANGE_START zera logo após o disparo e o resultado só
+    fica pronto (RESULT_INTERRUPT_STATUS) depois de ``tempo_medicao`` segundos.
+    Como num sensor recém-ligado, RESULT_INTERRUPT_STATUS só sinaliza o resultado
+    depois que SYSTEM_INTERRUPT_CONFIG_GPIO (0x0A) recebe 0x04 (nova amostra).
+    ``tempo_medicao`` segue os registradores de sequência, VCSEL e timeouts, como
+    o orçamento de medição do sensor real.
+
+    Args:
+        distancia (int): Distância medida em mm
+        tempo_medicao (float): Duração inicial de uma medição em segundos
+        ruido (float): Desvio padrão do ruído em mm
+        semente (int): Semente do gerador de ruído
+    """
+
+    endereco = 0x29
+    TEMPO_INICIO = 0.0002   # Tempo até o bit de início de SYSRANGE_START voltar a 0
+    _REGISTRADORES_TEMPO = {0x01, 0x46, 0x50, 0x51, 0x52, 0x70, 0x71, 0x72}
+
+    def __init__(self, distancia=100, tempo_medicao=0.033, ruido=0.0, semente=0):
+        super().__init__()
+        self.distancia = distancia
+        self.ruido = ruido
+        self._aleatorio = random.Random(semente)
+        self.registradores[0xC0] = 0xEE     # Model ID
+        # Sequência padrão após a inicialização: DSS, pre-range e final-range; VCSEL 14/10
+        self.registradores[0x01] = 0xE8
+        self.registradores[0x46] = 0x0B
+        self.registradores[0x50] = 0x06
+        self.registradores[0x51:0x53] = (26 - 1).to_bytes(2, "big")
+        self.registradores[0x70] = 0x04
+        # Timeout que resulta em tempo_medicao (a duração conta o custo de início maior)
+        orcamento = round(tempo_medicao * 1e6) - (CUSTO_INICIO_US - CUSTO_INICIO_DEFINIR_US)
+        self.registradores[0x71:0x73] = timeout_final(self._sequencia(), orcamento).to_bytes(2, "big")
+        self.tempo_medicao = orcamento_us(self._sequencia()) / 1e6
+        self._disparo = None                # Instante do último disparo
+        self._periodo = None                # None = medição única
+        self._lidos = 0                     # Resultados já liberados (interrupt clear)
+        self._pronto = False
+
+    def _sequencia(self):
+        r = self.registradores
+        return decodificar_sequencia(r[0x01], r[0x50], r[0x46], r[0x51] << 8 | r[0x52],
+                                     r[0x70], r[0x71] << 8 | r[0x72])
+
+    def _escrever_registrador(self, reg, valor):
+        super()._escrever_registrador(reg, valor)
+        agora = time.monotonic()
+        if reg in self._REGISTRADORES_TEMPO and self.registradores[0x01] & 0x80:
+            self.tempo_medicao = orcamento_us(self._sequencia()) / 1e6
+        if reg == 0x00:
+            if valor & 0x02:            # Back-to-back
+                self._iniciar(agora, self.tempo_medicao)
+            elif valor & 0x04:          # Temporizado
+                periodo = int.from_bytes(self.registradores[0x04:0x08], "big") / 1000
+                self._iniciar(agora, max(periodo, self.tempo_medicao))
+            elif valor & 0x01:
+                if self._periodo is not None:   # 0x01 durante o modo contínuo = parar
+                    self._periodo = None
+                    self.registradores[0x00] = 0x00
+                else:
+                    self._iniciar(agora, None)
+        elif reg == 0x0B and valor & 0x01:
+            self._pronto = False
+            self.registradores[0x13] = 0x00
+            if self._periodo is not None:
+                self._lidos = self._medicoes_concluidas(agora)
+
+    def _iniciar(self, agora, periodo):
+        self._disparo = agora
+        self._periodo = periodo
+        self._lidos = 0
+        self._pronto = False
+
+    def _medicoes_concluidas(self, agora):
+        return int((agora - self._disparo) / self._periodo)
+
+    def _ler_registrador(self, reg):
+        agora = time.monotonic()
+        if reg == 0x00 and self._periodo is None and self._disparo is not None:
+            if agora - self._disparo >= self.TEMPO_INICIO:
+                self.registradores[0x00] &= ~0x01
+        elif reg in (0x13, 0x1E, 0x1F):
+            self._atualizar(agora)
+        return self.registradores[reg]
+
+    def _atualizar(self, agora):
+        """Publica um novo resultado quando a medição em andamento termina"""
+        if self._pronto or self._disparo is None:
+            return
+        if self._periodo is None:
+            concluido = agora - self._disparo >= self.tempo_medicao
+        else:
+            concluido = self._medicoes_concluidas(agora) > self._lidos
+        if not concluido:
+            return
+        distancia = self.distancia
+        if self.ruido:
+            distancia += self._aleatorio.gauss(0, self.ruido)
+        distancia = max(0, min(8190, int(round(distancia))))
+        self.registradores[0x1E] = distancia >> 8
+        self.registradores[0x1F] = distancia & 0xFF
+        if (self.registradores[0x0A] & 0x07) == 0x04:
+            self.registradores[0x13] = 0x04    # Nova amostra pronta
+        self._pronto = True
+
+
+class PCA9685Simulado(DispositivoSimulado):
+    """
+    Controlador PWM: MODE1, PRESCALE, 16 canais e registradores ALL_LED.
+
+    O ponteiro só avança com o bit AI de MODE1 ligado, e PRESCALE só aceita
+    escrita com o chip em SLEEP, como no PCA9685 real.
+    """
+
+    endereco = 0x40
+
+    def __init__(self):
+        super().__init__()
+        self.registradores[0x00] = 0x11     # MODE1: SLEEP | ALLCALL
+        self.registradores[0xFE] = 0x1E     # PRESCALE padrão (~200 Hz)
+
+    def _auto_incremento(self):
+        return bool(self.registradores[0x00] & 0x20)
+
+    def _escrever_registrador(self, reg, valor):
+        if reg == 0xFE and not self.registradores[0x00] & 0x10:
+            return                          # PRESCALE ignorado fora do SLEEP
+        if reg == 0x00:
+            valor &= 0x7F                   # RESTART volta a 0 sozinho
+        super()._escrever_registrador(reg, valor)
+        if 0xFA <= reg <= 0xFD:             # ALL_LED replica em todos os canais
+            for canal in range(16):
+                self.registradores[0x06 + 4 * canal + reg - 0xFA] = valor
+
+    def pwm(self, canal):
+        """Valores (on, off) de 13 bits do canal"""
+        r = self.registradores[0x06 + 4 * canal:0x0A + 4 * canal]
+        return r[0] | (r[1] << 8), r[2] | (r[3] << 8)
+
+    @property
+    def frequencia(self):
+        return 25_000_000 / (4096 * (self.registradores[0xFE] + 1))
+
+
+# ===================== GPIO =====================
+
+# Equivalentes mínimos dos tipos de gpiod usados pelo Botao: o GPIO simulado não
+# depende da libgpiod instalada
+class Value(enum.Enum):
+    INACTIVE = 0
+    ACTIVE = 1
+
+
+class Direction(enum.Enum):
+    AS_IS = 1
+    INPUT = 2
+    OUTPUT = 3
+
+
+class Edge(enum.Enum):
+    NONE = 1
+    RISING = 2
+    FALLING = 3
+    BOTH = 4
+
+
+class EdgeEvent:
+    class Type(enum.Enum):
+        RISING_EDGE = 1
+        FALLING_EDGE = 2
+
+
+LineSettings = namedtuple("LineSettings", ["direction", "edge_detection", "debounce_period"],
+                          defaults=(Direction.AS_IS, Edge.NONE, None))
+
+EventoBordaSimulado = namedtuple(
+    "EventoBordaSimulado", ["event_type", "timestamp_ns", "line_offset", "global_seqno", "line_seqno"])
+
+
+class GPIOSimulado:
+    """
+    Backend de GPIO simulado com a mesma interface usada de ``gpiod``.
+
+    Passe para ``Botao(..., gpio=GPIOSimulado())`` e gere eventos com
+    ``pressionar``/``soltar``. As linhas ficam em nível alto (liberado) por padrão.
+    O debounce descarta bordas mais próximas que o período configurado.
+    Os tipos (``LineSettings``, ``EdgeEvent``, ``line.Value``...) são os deste
+    módulo, então a libgpiod não precisa estar instalada.
+    """
+
+    LineSettings = LineSettings
+    EdgeEvent = EdgeEvent
+    line = SimpleNamespace(Direction=Direction, Edge=Edge, Value=Value)
+
+    def __init__(self):
+        self.valores = {}           # porta -> Value
+        self.requisicoes = []
+
+    def Chip(self, caminho):
+        return _ChipSimulado()
+
+    def request_lines(self, path, config, consumer=None, **kwargs):
+        requisicao = RequisicaoSimulada(self, config)
+        self.requisicoes.append(requisicao)
+        return requisicao
+
+    def _definir(self, porta, valor):
+        anterior = self.valores.get(porta, Value.ACTIVE)
+        self.valores[porta] = valor
+        if anterior != valor:
+            for requisicao in self.requisicoes:
+                requisicao._borda(porta, valor)
+
+    def pressionar(self, porta):
+        self._definir(porta, Value.INACTIVE)
+
+    def soltar(self, porta):
+        self._definir(porta, Value.ACTIVE)
+
+
+class _ChipSimulado:
+    def close(self):
+        pass
+
+
+class RequisicaoSimulada:
+    """Equivalente a ``gpiod.LineRequest`` para um GPIOSimulado"""
+
+    def __init__(self, gpio, config):
+        self._gpio = gpio
+        self.offsets = []
+        self._debounce_ns = {}
+        for linhas, ajustes in config.items():
+            linhas = linhas if isinstance(linhas, (tuple, list)) else (linhas,)
+            for linha in linhas:
+                self.offsets.append(linha)
+                debounce = ajustes.debounce_period
+                self._debounce_ns[linha] = int(debounce.total_seconds() * 1e9) if debounce else 0
+        self._eventos = deque()
+        self._ultima_borda = {}
+        self._seqno = 0
+        self._lock = threading.Lock()
+        self._leitura, self._escrita = os.pipe()   # fd para select/asyncio
+        self.fd = self._leitura
+
+    def fileno(self):
+        return self.fd
+
+    def _borda(self, linha, valor):
+        if linha not in self._debounce_ns:
+            return
+        agora = time.monotonic_ns()
+        ultima = self._ultima_borda.get(linha)
+        if ultima is not None and agora - ultima < self._debounce_ns[linha]:
+            return
+        self._ultima_borda[linha] = agora
+        with self._lock:
+            self._seqno += 1
+            tipo = EdgeEvent.Type.FALLING_EDGE if valor == Value.INACTIVE else EdgeEvent.Type.RISING_EDGE
+            self._eventos.append(EventoBordaSimulado(tipo, agora, linha, self._seqno, self._seqno))
+            os.write(self._escrita, b"\0")
+
+    def get_value(self, linha):
+        return self._gpio.valores.get(linha, Value.ACTIVE)
+
+    def get_values(self, linhas=None):
+        return [self.get_value(l) for l in (linhas or self.offsets)]
+
+    def wait_edge_events(self, timeout=None):
+        if hasattr(timeout, "total_seconds"):
+            timeout = timeout.total_seconds()
+        prontos, _, _ = select.select([self._leitura], [], [], timeout)
+        return bool(prontos)
+
+    def read_edge_events(self, max_events=None):
+        with self._lock:
+            n = len(self._eventos) if max_events is None else min(max_events, len(self._eventos))
+            eventos = [self._eventos.popleft() for _ in range(n)]
+            if n:
+                os.read(self._leitura, n)
+        return eventos
+
+    def release(self):
+        os.close(self._leitura)
+        os.close(self._escrita)
+        self._gpio.requisicoes.remove(self)
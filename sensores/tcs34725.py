@@ -1,123 +1,428 @@
+import math
 import time
-from sensores.i2cmodule import I2CModule
-from smbus2 import SMBus
+import struct
+import asyncio
+import numpy as np
+from sensores.i2cmodule import I2CModule, I2C_DEVICE
+from sensores.instrumentacao import dormir
 from sensores.configuracao import Configuracao
+from sensores.estatistica import medir_ate_estabilizar
 
 # ===== ENDEREÇOS =====
 TCS34725_ADDR = 0x29      # Endereço I2C do sensor TCS34725
 COMMAND_BIT = 0x80        # Bit de comando para acessar os registradores do sensor
+AUTO_INCREMENT = 0x20     # Tipo de comando com auto-incremento do endereço do registrador
+REG_STATUS = 0x13         # Registrador de status
+AVALID = 0x01             # Bit de STATUS: um ciclo completo desde que AEN foi ligado
+REG_CDATAL = 0x14         # Primeiro dos 8 registradores de dados (C, R, G, B em little-endian)
+
+# ===== FAIXA AUTOMÁTICA =====
+GANHO_REFERENCIA = 4            # Leituras com faixa automática são reescaladas para 4x ...
+TEMPO_REFERENCIA_MS = 24        # ... e 24 ms, a configuração padrão usada na calibração
+ALVO_CLEAR = 1000               # Contagem do canal clear buscada pela faixa automática
+TEMPO_MAXIMO_MS = 153.6         # Maior integração usada pela faixa automática (64 ciclos)
+SATURACAO = 0.8                 # Fração do fundo de escala tratada como saturada
+CONTAGENS_POR_CICLO = 1024      # Fundo de escala de cada ciclo de 2,4 ms
+TEMPO_INICIALIZACAO_MS = 2.4    # Inicialização do RGBC entre ligar AEN e o primeiro ciclo
+
+# Nomes retornados por nome_cor/classificar (o índice é o código usado em classificar_codigos)
+NOMES_CORES = ("Preto", "Branco", "Vermelho", "Verde", "Azul", "Indefinido")
 
 
 class TCS34725(I2CModule):
-    def __init__(self, canal_mux, chave_sensor: str = "sensor_tcs34725"):
+    CANAIS_AMOSTRA = 4        # Amostras (R, G, B, C) para sensores.amostragem
+    TIPO_AMOSTRA = "uint16"
+
+    def __init__(self, canal_mux, chave_sensor: str = "sensor_tcs34725", leitura_burst=True,
+                 auto_faixa=False, alvo_clear=ALVO_CLEAR, tempo_maximo_ms=TEMPO_MAXIMO_MS, filtro=None,
+                 barramento=I2C_DEVICE):
         """
         Inicializa o sensor TCS34725:
+        leitura_burst   -> lê os quatro canais em uma única transação (auto-incremento)
+        auto_faixa      -> ajusta ganho e tempo de integração a cada leitura (ver ler_cores)
+        alvo_clear      -> contagem do canal clear buscada pela faixa automática
+        tempo_maximo_ms -> maior tempo de integração usado pela faixa automática
+        filtro          -> filtro de sensores.filtros aplicado a cada leitura (R, G, B, C)
+        barramento      -> número do adaptador I2C (/dev/i2c-N)
         """
-        super().__init__(TCS34725_ADDR, canal_mux)
+        super().__init__(TCS34725_ADDR, canal_mux, barramento)
+        self.leitura_burst = leitura_burst
+        self.auto_faixa = auto_faixa
+        self.alvo_clear = alvo_clear
+        self.tempo_maximo_ms = tempo_maximo_ms
+        self.filtro = filtro            # Aplicado em toda leitura (ver sensores.filtros)
+        self._pronto_em = 0.0       # Instante (time.monotonic) do primeiro ciclo após reconfigurar
+        self._reconfigurado = False # Próxima leitura confere AVALID antes de usar os dados
         self._habilitar_sensor()                # Liga o sensor
         self._tempo_integracao(24)              # Tempo de integração = 24 ms
         self._ganho(4)                          # Ganho = 4x (valor padrão)
 
-        # Configuração para salvar e recuperar calibração
+        # Configuração para salvar e recuperar calibração (o arquivo .pkl só é
+        # aberto quando a calibração é usada pela primeira vez)
         self.chave_sensor = chave_sensor
-        self.config = Configuracao("calibracao_tcs34725")  # cria/abre arquivo .pkl
+        self._config = None
         self.CHAVE_PRETO = f"{self.chave_sensor}_preto"
         self.CHAVE_BRANCO = f"{self.chave_sensor}_branco"
+        self._valores_min = self._valores_max = self._calibracao = None
+        self._calibracao_carregada = False
+
+    # ---------------- CALIBRAÇÃO CARREGADA ----------------
+    @property
+    def config(self):
+        """Arquivo de calibração (cria/abre o .pkl no primeiro acesso)"""
+        if self._config is None:
+            self._config = Configuracao("calibracao_tcs34725")
+        return self._config
+
+    def _carregar_calibracao(self):
+        """Carrega os valores de calibração salvos, se existirem, na primeira vez"""
+        if self._calibracao_carregada:
+            return
+        self._calibracao_carregada = True
+        self._valores_min = self.config.obtem(self.CHAVE_PRETO)
+        self._valores_max = self.config.obtem(self.CHAVE_BRANCO)
+        self._preparar_calibracao()
+
+    @property
+    def valores_min(self):
+        """Leitura (R, G, B, C) do preto usada na normalização"""
+        self._carregar_calibracao()
+        return self._valores_min
+
+    @valores_min.setter
+    def valores_min(self, valores):
+        self._carregar_calibracao()
+        self._valores_min = valores
+        self._preparar_calibracao()
+
+    @property
+    def valores_max(self):
+        """Leitura (R, G, B, C) do branco usada na normalização"""
+        self._carregar_calibracao()
+        return self._valores_max
 
-        # Carrega valores de calibração salvos, se existirem
-        self.valores_min = self.config.obtem(self.CHAVE_PRETO)
-        self.valores_max = self.config.obtem(self.CHAVE_BRANCO)
+    @valores_max.setter
+    def valores_max(self, valores):
+        self._carregar_calibracao()
+        self._valores_max = valores
+        self._preparar_calibracao()
 
+    def _preparar_calibracao(self):
+        """Pré-calcula os vetores de deslocamento (preto) e faixa (branco - preto)"""
+        if self._valores_min is None or self._valores_max is None:
+            self._calibracao = None
+            return
+        minimo = np.asarray(self._valores_min, dtype=np.float64)
+        faixa = np.asarray(self._valores_max, dtype=np.float64) - minimo
+        valido = faixa != 0                       # Canais com max == min ficam em 0
+        faixa[~valido] = 1.0
+        self._calibracao = (minimo, faixa, valido)
 
     # ---------------- CONFIGURAÇÃO DO SENSOR ----------------
     def _write8(self, reg, valor):
         """Escreve 1 byte no registrador indicado do TCS34725"""
-        self.bus.write_byte_data(TCS34725_ADDR, COMMAND_BIT | reg, valor)
+        self._escrever_byte(COMMAND_BIT | reg, valor)
 
     def _read16(self, reg):
         """Lê 2 bytes (word) de um registrador do TCS34725 e combina em inteiro de 16 bits"""
-        dados = self.bus.read_i2c_block_data(TCS34725_ADDR, COMMAND_BIT | reg, 2)
+        dados = self._ler_registradores(((COMMAND_BIT | AUTO_INCREMENT | reg, 2),))[0]
         return dados[1] << 8 | dados[0]
 
     def _habilitar_sensor(self):
         """Liga o sensor: Power ON + habilita RGBC (cor)"""
         self._write8(0x00, 0x01)  # Liga o sensor (PON)
-        time.sleep(0.01)
+        dormir(0.01, "tcs34725.ligar")
         self._write8(0x00, 0x03)  # Liga a leitura de cores (PON + AEN)
 
     def _tempo_integracao(self, ms):
         """Configura o tempo de integração do sensor (ATIME)"""
-        atime = 256 - int(ms / 2.4)  # Conversão do tempo em ms para valor do registrador
+        self._ciclos_integracao(int(ms / 2.4))  # Conversão do tempo em ms para ciclos de 2,4 ms
+
+    def _ciclos_integracao(self, ciclos):
+        """Configura o tempo de integração em ciclos de 2,4 ms (1 a 256)"""
+        atime = 256 - ciclos
         self._write8(0x01, atime)
+        self.ciclos = ciclos
+        self.tempo_integracao_ms = (256 - atime) * 2.4  # Tempo efetivo de um ciclo
 
     def _ganho(self, ganho):
         """Configura o ganho do sensor (CONTROL)"""
         ganhos = {1: 0x00, 4: 0x01, 16: 0x02, 60: 0x03}
         self._write8(0x0F, ganhos.get(ganho, 0x01))
+        self.ganho = ganho if ganho in ganhos else 4
+
+    # ---------------- FAIXA AUTOMÁTICA ----------------
+    def _escala(self):
+        """Fator que leva contagens da configuração atual para 4x / 24 ms"""
+        return (GANHO_REFERENCIA / self.ganho) * (TEMPO_REFERENCIA_MS / self.tempo_integracao_ms)
+
+    def _ajustar_faixa(self, clear):
+        """
+        Escolhe ganho e integração para as próximas leituras a partir do canal clear
+        Usa o maior ganho que não satura um ciclo e o menor tempo que alcança
+        alvo_clear. Só reconfigura quando a leitura sai de [alvo/2, 2*alvo] ou satura.
+        """
+        fundo = min(65535, CONTAGENS_POR_CICLO * self.ciclos)
+        saturado = clear >= SATURACAO * fundo
+        if not saturado and self.alvo_clear / 2 <= clear <= self.alvo_clear * 2:
+            return
+
+        # Contagens por ms com ganho 1x; saturado, a taxa real é maior que a medida
+        taxa = max(clear, 0.25) / (self.ganho * self.tempo_integracao_ms)
+        if saturado:
+            taxa *= 4
+        limite = SATURACAO * CONTAGENS_POR_CICLO / 2.4
+        ganho = next((g for g in (60, 16, 4) if taxa * g <= limite), 1)
+        ciclos = math.ceil(self.alvo_clear / (taxa * ganho) / 2.4)
+        ciclos = max(1, min(ciclos, int(self.tempo_maximo_ms / 2.4), 256))
+        if ganho != self.ganho or ciclos != self.ciclos:
+            self._configurar_faixa(ganho, ciclos)
+
+    def _configurar_faixa(self, ganho, ciclos):
+        """Aplica ganho e integração e reinicia a integração (AEN 0 -> 1)"""
+        self._ganho(ganho)
+        self._ciclos_integracao(ciclos)
+        self._write8(0x00, 0x01)
+        self._write8(0x00, 0x03)
+        self._pronto_em = time.monotonic() + (TEMPO_INICIALIZACAO_MS + self.tempo_integracao_ms) / 1000.0
+        self._reconfigurado = True
+
+    def _dados_validos(self):
+        """
+        Consulta AVALID depois de reiniciar a integração
+        Até o primeiro ciclo na configuração nova, os registradores ainda têm os
+        dados da anterior, que a nova escala transformaria em uma leitura errada.
+        """
+        return bool(self._ler_byte(COMMAND_BIT | REG_STATUS) & AVALID)
+
+    def _limite_dados_validos(self):
+        """Até quando consultar AVALID: uma inicialização e um ciclo a partir de agora"""
+        return time.monotonic() + (TEMPO_INICIALIZACAO_MS + self.tempo_integracao_ms) / 1000.0
+
+    def _aguardar_dados_validos(self):
+        """Espera o primeiro ciclo após reconfigurar (prazo previsto e AVALID)"""
+        restante = self._pronto_em - time.monotonic()
+        if restante > 0:
+            dormir(restante, "tcs34725.integracao")
+        if self._reconfigurado:
+            limite = self._limite_dados_validos()
+            while not self._dados_validos() and time.monotonic() < limite:
+                dormir(TEMPO_INICIALIZACAO_MS / 1000.0, "tcs34725.integracao")
+            self._reconfigurado = False
+
+    async def _aguardar_dados_validos_async(self):
+        """Versão assíncrona de _aguardar_dados_validos: cede o laço nas esperas"""
+        restante = self._pronto_em - time.monotonic()
+        if restante > 0:
+            await asyncio.sleep(restante)
+        if self._reconfigurado:
+            limite = self._limite_dados_validos()
+            while not self._dados_validos() and time.monotonic() < limite:
+                await asyncio.sleep(TEMPO_INICIALIZACAO_MS / 1000.0)
+            self._reconfigurado = False
 
     # ---------------- LEITURA ----------------
+    def _ler_burst(self):
+        """Lê os 8 registradores de dados em uma transação e decodifica (R, G, B, C)"""
+        dados = self._ler_registradores(((COMMAND_BIT | AUTO_INCREMENT | REG_CDATAL, 8),))[0]
+        c, r, g, b = struct.unpack("<4H", bytes(dados))
+        return r, g, b, c
+
     def ler_cores(self):
-        """Retorna os valores brutos dos canais (R, G, B, C)"""
-        c = self._read16(0x14)  # Canal Clear (luz total)
-        r = self._read16(0x16)  # Vermelho
-        g = self._read16(0x18)  # Verde
-        b = self._read16(0x1A)  # Azul
+        """
+        Retorna os valores brutos dos canais (R, G, B, C)
+        Com auto_faixa, os valores são reescalados para ganho 4x e 24 ms (a
+        configuração da calibração), e ganho/integração são ajustados para a
+        próxima leitura; logo após um ajuste, espera a inicialização e o primeiro
+        ciclo novo (AVALID).
+        Com filtro, retorna a saída do filtro (arredondada).
+        """
+        if self.auto_faixa:
+            self._aguardar_dados_validos()
+        return self._concluir_leitura()
+
+    def _concluir_leitura(self):
+        """Lê, aplica a faixa automática e o filtro; não espera nada"""
+        if not self.auto_faixa:
+            cores = self._ler_bruto()
+        else:
+            escala = self._escala()
+            bruto = self._ler_bruto()
+            self._ajustar_faixa(bruto[3])
+            cores = tuple(min(65535, int(round(v * escala))) for v in bruto)
+        if self.filtro is not None:
+            cores = tuple(int(round(v)) for v in self.filtro.atualizar(cores))
+        return cores
+
+    def _ler_bruto(self):
+        """Leitura (R, G, B, C) na configuração atual de ganho e integração"""
+        if self.leitura_burst:
+            return self._ler_burst()  # Os quatro canais vêm do mesmo ciclo de integração
+        # Clear, vermelho, verde e azul: um ponteiro e 2 bytes cada, no mesmo ioctl
+        c, r, g, b = (dados[1] << 8 | dados[0] for dados in self._ler_registradores(
+            tuple((COMMAND_BIT | AUTO_INCREMENT | reg, 2) for reg in (0x14, 0x16, 0x18, 0x1A))))
         return r, g, b, c
 
+    async def ler_cores_async(self):
+        """
+        Espera um ciclo de integração sem bloquear o laço do asyncio e retorna (R, G, B, C)
+        Com auto_faixa, a espera pelo primeiro ciclo após um ajuste também é assíncrona.
+        """
+        await asyncio.sleep(self.tempo_integracao_ms / 1000.0)
+        if self.auto_faixa:
+            await self._aguardar_dados_validos_async()
+        return self._concluir_leitura()
+
+    def ler_cores_n(self, n, saida=None):
+        """
+        Faz n leituras seguidas e retorna um array (n, 4) de uint16 com (R, G, B, C)
+        Espera um ciclo de integração entre leituras para não repetir a mesma amostra.
+        saida -> array (n, 4) já alocado para ser reaproveitado entre chamadas
+        """
+        if saida is None:
+            saida = np.empty((n, 4), dtype=np.uint16)
+        for i in range(n):
+            if i:
+                dormir(self.tempo_integracao_ms / 1000.0, "tcs34725.integracao")
+            saida[i] = self.ler_cores()
+        return saida
+
+    def periodo_amostragem(self):
+        """Um ciclo de integração: intervalo entre duas leituras novas"""
+        return self.tempo_integracao_ms / 1000.0
+
+    def _ler_amostra(self, destino):
+        destino[:] = self.ler_cores()
+
     # ---------------- CALIBRAÇÃO ----------------
-    def calibrar(self, amostras):
+    def calibrar(self, amostras=100, tolerancia_relativa=0.005):
         """
         Realiza calibração do sensor para branco e preto
-        Salva os valores no arquivo de calibração para uso posterior
+        Salva os valores e suas variâncias no arquivo de calibração para uso posterior
+        amostras            -> máximo de leituras por superfície
+        tolerancia_relativa -> para de ler quando o intervalo de confiança (95%) da
+                               média de cada canal estiver dentro desta fração dela
         """
         print("Coloque o sensor sobre uma superfície BRANCA e pressione ENTER.")
         input()
-        branco = self._media(amostras)
+        branco, var_branco = self._media(amostras, tolerancia_relativa)
         print(f"Leitura BRANCO: {branco}")
 
         print("Coloque o sensor sobre uma superfície PRETA e pressione ENTER.")
         input()
-        preto = self._media(amostras)
+        preto, var_preto = self._media(amostras, tolerancia_relativa)
         print(f"Leitura PRETO: {preto}")
 
         self.valores_max = branco
         self.valores_min = preto
 
-        # Salva valores no arquivo de calibração
-        self.config.insere(self.CHAVE_BRANCO, branco)
-        self.config.insere(self.CHAVE_PRETO, preto)
+        # Salva valores no arquivo de calibração (uma única gravação)
+        with self.config.lote():
+            self.config.insere(self.CHAVE_BRANCO, branco)
+            self.config.insere(self.CHAVE_PRETO, preto)
+            self.config.insere(f"{self.CHAVE_BRANCO}_variancia", var_branco)
+            self.config.insere(f"{self.CHAVE_PRETO}_variancia", var_preto)
 
         print("Calibração concluída.")
 
-    def _media(self, amostras):
-        """Faz a média de N leituras (R, G, B, C)"""
-        sr = sg = sb = sc = 0
-        for _ in range(amostras):
-            r, g, b, c = self.ler_cores()
-            sr += r; sg += g; sb += b; sc += c
-        return sr // amostras, sg // amostras, sb // amostras, sc // amostras
+    def _media(self, amostras, tolerancia_relativa=0.0):
+        """
+        Média de até N leituras (R, G, B, C), sem o filtro, uma por ciclo de integração
+        Para antes se a média já estiver estável; descarta leituras espúrias.
+        Retorna (média, variância) por canal.
+        """
+        periodo = self.periodo_amostragem()
+        # O ciclo em andamento pode ter começado antes de trocar a superfície
+        dormir(2 * periodo, "calibracao")
+        filtro, self.filtro = self.filtro, None
+        try:
+            estatistica = medir_ate_estabilizar(
+                self.ler_cores, amostras, tolerancia_relativa=tolerancia_relativa, intervalo=periodo)
+        finally:
+            self.filtro = filtro
+        meia_largura = estatistica.meia_largura()
+        print(f"  {estatistica.n} leituras ({estatistica.rejeitadas} descartadas), "
+              f"IC 95%: ±{', '.join(f'{v:.1f}' for v in meia_largura)}")
+        media = tuple(int(v) for v in estatistica.media)
+        return media, tuple(float(v) for v in estatistica.variancia)
 
     # ---------------- NORMALIZAÇÃO ----------------
-    def cores_normalizadas(self):
-        """Normaliza valores R,G,B,C para escala 0–255 usando os valores de calibração"""
-        if self.valores_min is None or self.valores_max is None:
+    def cores_normalizadas(self, amostra=None):
+        """
+        Normaliza valores R,G,B,C para escala 0–255 usando os valores de calibração
+        amostra -> leitura bruta (R, G, B, C) já feita; se None, lê o sensor
+        """
+        self._carregar_calibracao()
+        if self._calibracao is None:
+            raise RuntimeError("É necessário calibrar o sensor antes de normalizar.")
+        if amostra is None:
+            amostra = self.ler_cores()
+        return self._normalizar(amostra)
+
+    async def cores_normalizadas_async(self):
+        """Versão assíncrona de cores_normalizadas (usa ler_cores_async)"""
+        self._carregar_calibracao()
+        if self._calibracao is None:
+            raise RuntimeError("É necessário calibrar o sensor antes de normalizar.")
+        return self._normalizar(await self.ler_cores_async())
+
+    def _normalizar(self, bruto):
+        """Aplica a calibração a uma leitura bruta (R, G, B, C)"""
+        return tuple(int(v) for v in self.normalizar(bruto))
+
+    def normalizar(self, amostras):
+        """
+        Normaliza um lote de leituras brutas de uma vez
+        amostras -> array (N, 4) ou (4,) com (R, G, B, C), ex.: saída de ler_cores_n
+        Retorna um array uint8 do mesmo formato, com o mesmo resultado de cores_normalizadas.
+        """
+        self._carregar_calibracao()
+        if self._calibracao is None:
             raise RuntimeError("É necessário calibrar o sensor antes de normalizar.")
+        minimo, faixa, valido = self._calibracao
+        perc = (np.asarray(amostras, dtype=np.float64) - minimo) / faixa  # Percentual entre preto e branco
+        np.clip(perc, 0.0, 1.0, out=perc)                                 # Garante que está no intervalo [0, 1]
+        perc *= 255
+        perc[..., ~valido] = 0
+        return perc.astype(np.uint8)
+
+    def classificar_codigos(self, amostras):
+        """
+        Classifica um lote de leituras brutas (N, 4) e retorna os índices em NOMES_CORES
+        """
+        n = self.normalizar(amostras)
+        r, g, b = n[..., 0], n[..., 1], n[..., 2]
+        # Mesmas regras de nome_cor, avaliadas na mesma ordem de prioridade
+        condicoes = [
+            (r < 20) & (g < 20) & (b < 20),
+            (r > 220) & (g > 220) & (b > 220),
+            (r > g) & (r > b),
+            (g > r) & (g > b),
+            (b > r) & (b > g),
+        ]
+        return np.select(condicoes, range(len(condicoes)), default=len(condicoes)).astype(np.uint8)
+
+    def classificar(self, amostras):
+        """
+        Classifica um lote de leituras brutas (N, 4) e retorna um array com os nomes das cores
+        """
+        return np.asarray(NOMES_CORES)[self.classificar_codigos(amostras)]
 
-        bruto = self.ler_cores()
-        normalizado = []
-        for i, valor in enumerate(bruto):
-            min_v, max_v = self.valores_min[i], self.valores_max[i]
-            if max_v == min_v:
-                normalizado.append(0)
-            else:
-                perc = (valor - min_v) / (max_v - min_v)  # Percentual entre preto e branco
-                perc = max(0.0, min(1.0, perc))          # Garante que está no intervalo [0, 1]
-                normalizado.append(int(perc * 255))
-        return tuple(normalizado)
-
-    def nome_cor(self):
-        """Retorna o nome da cor predominante com base nos valores normalizados"""
-        r, g, b, c = self.cores_normalizadas()
+    def nome_cor(self, amostra=None):
+        """
+        Retorna o nome da cor predominante com base nos valores normalizados
+        amostra -> leitura bruta (R, G, B, C) já feita, para não ler o sensor de novo
+        """
+        return self._nome_cor(self.cores_normalizadas(amostra))
+
+    async def nome_cor_async(self):
+        """Versão assíncrona de nome_cor (usa ler_cores_async)"""
+        return self._nome_cor(await self.cores_normalizadas_async())
+
+    @staticmethod
+    def _nome_cor(normalizado):
+        """Aplica as regras de cor a uma leitura normalizada (R, G, B, C)"""
+        r, g, b, c = normalizado
         if r < 20 and g < 20 and b < 20:
             return "Preto"
         if r > 220 and g > 220 and b > 220:
@@ -130,10 +435,6 @@ class TCS34725(I2CModule):
             return "Azul"
         return "Indefinido"
 
-    def close(self):
-        """Fecha o barramento I2C."""
-        self.bus.close()
-
 # # ===== TESTE =====
 # if __name__ == "__main__":
 #     sensor = TCS34725(canal_mux=1)
@@ -1,70 +1,494 @@
 import time
-from smbus2 import SMBus
+import asyncio
+from collections import namedtuple
 from sensores.configuracao import Configuracao 
-from sensores.i2cmodule import I2CModule
+from sensores.i2cmodule import I2CModule, I2C_DEVICE
+from sensores.instrumentacao import dormir
+from sensores.estatistica import medir_ate_estabilizar
 
 # ===== ENDEREÇOS =====
 VL53L0X_ADDR = 0x29       # Endereço do sensor VL53L0X
 
+# ===== REGISTRADORES =====
+SYSRANGE_START = 0x00                   # Inicia/para medições
+SYSTEM_INTERMEASUREMENT_PERIOD = 0x04   # Período do modo contínuo temporizado (32 bits)
+SYSTEM_INTERRUPT_CONFIG_GPIO = 0x0A     # Evento que gera a interrupção (0x04 = nova amostra pronta)
+SYSTEM_INTERRUPT_CLEAR = 0x0B           # Limpa o aviso de "resultado pronto"
+RESULT_INTERRUPT_STATUS = 0x13          # Bits 0-2 != 0 quando há resultado novo
+RESULT_RANGE_STATUS = 0x14              # Bloco de resultado (distância em +10)
+GPIO_HV_MUX_ACTIVE_HIGH = 0x84          # Bit 4: polaridade do pino GPIO1
+OSC_CALIBRATE_VAL = 0xF8                # Calibração do oscilador interno
+
+# ===== REGISTRADORES DE TEMPO =====
+SYSTEM_SEQUENCE_CONFIG = 0x01               # Etapas habilitadas (TCC, DSS, MSRC, pre-range, final-range)
+FINAL_RANGE_MIN_COUNT_RATE_RTN_LIMIT = 0x44 # Limite de taxa de sinal (MCPS, ponto fixo 9.7)
+MSRC_CONFIG_TIMEOUT_MACROP = 0x46           # Timeout do MSRC/DSS/TCC
+FINAL_RANGE_CONFIG_VALID_PHASE_LOW = 0x47   # Seguido de ..._HIGH (0x48)
+PRE_RANGE_CONFIG_VCSEL_PERIOD = 0x50        # Seguido do timeout do pre-range (0x51-0x52)
+PRE_RANGE_CONFIG_VALID_PHASE_LOW = 0x56     # Seguido de ..._HIGH (0x57)
+FINAL_RANGE_CONFIG_VCSEL_PERIOD = 0x70      # Seguido do timeout do final-range (0x71-0x72)
+GLOBAL_CONFIG_VCSEL_WIDTH = 0x32
+ALGO_PHASECAL_CONFIG_TIMEOUT = 0x30
+ALGO_PHASECAL_LIM = 0x30                    # Na página 1 (0xFF = 0x01)
+
+INTERVALO_POLL = 0.002    # Espera entre consultas de "resultado pronto"
+TEMPO_LIMITE_PADRAO = 0.5     # Espera máxima (s) por um resultado além do tempo previsto
+TEMPO_MEDICAO_PADRAO_MS = 33  # Orçamento de tempo de medição padrão do sensor
+ORCAMENTO_MINIMO_US = 20000   # Menor orçamento de medição aceito pelo sensor
+
+# Custos fixos (µs) de cada etapa da sequência de medição, da API da ST
+CUSTO_INICIO_US = 1910           # Ao calcular a duração de uma medição
+CUSTO_INICIO_DEFINIR_US = 1320   # Ao programar o orçamento (o timeout do final-range)
+CUSTO_FIM_US = 960
+CUSTO_MSRC_US = 660
+CUSTO_TCC_US = 590
+CUSTO_DSS_US = 690
+CUSTO_PRE_RANGE_US = 660
+CUSTO_FINAL_RANGE_US = 550
+
+# Fases válidas por período do VCSEL (pclks)
+FASE_PRE_RANGE = {12: 0x18, 14: 0x30, 16: 0x40, 18: 0x50}
+# período final -> (VALID_PHASE_HIGH, VCSEL_WIDTH, PHASECAL_TIMEOUT, PHASECAL_LIM)
+FASE_FINAL_RANGE = {8: (0x10, 0x02, 0x0C, 0x30), 10: (0x28, 0x03, 0x09, 0x20),
+                    12: (0x38, 0x03, 0x08, 0x20), 14: (0x48, 0x03, 0x07, 0x20)}
+
+# Perfil de medição: orçamento (µs), limite de sinal (MCPS) e períodos do VCSEL (pclks)
+PerfilVL53L0X = namedtuple("PerfilVL53L0X", ["orcamento_us", "limite_sinal_mcps", "vcsel_pre", "vcsel_final"])
+
+PERFIS = {
+    "alta_velocidade": PerfilVL53L0X(20000, 0.25, 14, 10),
+    "padrao": PerfilVL53L0X(33000, 0.25, 14, 10),
+    "alta_precisao": PerfilVL53L0X(200000, 0.25, 14, 10),
+    "longo_alcance": PerfilVL53L0X(33000, 0.1, 18, 14),
+}
+
+# Etapas habilitadas e seus timeouts, lidos de SYSTEM_SEQUENCE_CONFIG e dos registradores de timeout
+Sequencia = namedtuple("Sequencia", [
+    "tcc", "dss", "msrc", "pre_range", "final_range", "vcsel_pre", "vcsel_final",
+    "msrc_us", "pre_range_mclks", "pre_range_us", "final_range_us"])
+
+
+# ----- CONVERSÕES DE TEMPO -----
+def _periodo_macro_ns(vcsel):
+    return (2304 * vcsel * 1655 + 500) // 1000
+
+def _mclks_para_us(mclks, vcsel):
+    return (mclks * _periodo_macro_ns(vcsel) + 500) // 1000
+
+def _us_para_mclks(us, vcsel):
+    periodo = _periodo_macro_ns(vcsel)
+    return (us * 1000 + periodo // 2) // periodo
+
+def _decodificar_timeout(valor):
+    """Timeout de 16 bits (LSB * 2^MSB + 1) em macro-clocks"""
+    return ((valor & 0xFF) << (valor >> 8)) + 1
+
+def _codificar_timeout(mclks):
+    if mclks <= 0:
+        return 0
+    lsb, msb = mclks - 1, 0
+    while lsb > 0xFF:
+        lsb >>= 1
+        msb += 1
+    return (msb << 8) | lsb
+
+def decodificar_sequencia(config, vcsel_pre, msrc, pre_timeout, vcsel_final, final_timeout):
+    """Monta a Sequencia a partir dos valores crus dos registradores"""
+    vcsel_pre = (vcsel_pre + 1) << 1
+    vcsel_final = (vcsel_final + 1) << 1
+    pre_range = bool(config & 0x40)
+    pre_mclks = _decodificar_timeout(pre_timeout)
+    final_mclks = _decodificar_timeout(final_timeout)
+    if pre_range:
+        final_mclks -= pre_mclks    # O timeout final inclui o do pre-range
+    return Sequencia(
+        tcc=bool(config & 0x10), dss=bool(config & 0x08), msrc=bool(config & 0x04),
+        pre_range=pre_range, final_range=bool(config & 0x80),
+        vcsel_pre=vcsel_pre, vcsel_final=vcsel_final,
+        msrc_us=_mclks_para_us(msrc + 1, vcsel_pre),
+        pre_range_mclks=pre_mclks, pre_range_us=_mclks_para_us(pre_mclks, vcsel_pre),
+        final_range_us=_mclks_para_us(final_mclks, vcsel_final))
+
+def _custo_fixo_us(seq, inicio=CUSTO_INICIO_US):
+    """Parte do orçamento gasta fora do final-range"""
+    usado = inicio + CUSTO_FIM_US
+    if seq.tcc:
+        usado += seq.msrc_us + CUSTO_TCC_US
+    if seq.dss:
+        usado += 2 * (seq.msrc_us + CUSTO_DSS_US)
+    elif seq.msrc:
+        usado += seq.msrc_us + CUSTO_MSRC_US
+    if seq.pre_range:
+        usado += seq.pre_range_us + CUSTO_PRE_RANGE_US
+    if seq.final_range:
+        usado += CUSTO_FINAL_RANGE_US
+    return usado
+
+def orcamento_us(seq):
+    """Duração total (µs) de uma medição com a sequência dada"""
+    return _custo_fixo_us(seq) + (seq.final_range_us if seq.final_range else 0)
+
+def timeout_final(seq, orcamento):
+    """Valor codificado de FINAL_RANGE_CONFIG_TIMEOUT para atingir o orçamento (µs)"""
+    final_us = orcamento - _custo_fixo_us(seq, CUSTO_INICIO_DEFINIR_US)
+    if final_us <= 0:
+        raise ValueError(f"Orçamento de {orcamento} µs é menor que o custo fixo da sequência.")
+    mclks = _us_para_mclks(final_us, seq.vcsel_final)
+    if seq.pre_range:
+        mclks += seq.pre_range_mclks
+    return _codificar_timeout(mclks)
+
+def _final_range_mclks(seq, valor):
+    """Macro-clocks do final-range (sem o pre-range) de um timeout codificado"""
+    return _decodificar_timeout(valor) - (seq.pre_range_mclks if seq.pre_range else 0)
+
 class VL53L0X(I2CModule):
     """Classe para controle do sensor de distância VL53L0X"""
-    def __init__(self, canal_mux=0):
-        super().__init__(VL53L0X_ADDR, canal_mux)
+    CANAIS_AMOSTRA = 1        # Distância (mm, com offset) para sensores.amostragem
+    TIPO_AMOSTRA = "int32"
+
+    def __init__(self, canal_mux=0, perfil=None, filtro=None, barramento=I2C_DEVICE,
+                 tempo_limite=TEMPO_LIMITE_PADRAO):
+        """
+        perfil -> nome em PERFIS ("alta_velocidade", "padrao", "alta_precisao",
+                  "longo_alcance"); None mantém a configuração atual do sensor
+        filtro -> filtro de sensores.filtros aplicado a cada distância lida
+        barramento -> número do adaptador I2C (/dev/i2c-N)
+        tempo_limite -> segundos de espera por um resultado, além do tempo previsto,
+                        antes de levantar TimeoutError (0 = sem limite)
+        """
+        super().__init__(VL53L0X_ADDR, canal_mux, barramento)
+        self.tempo_limite = tempo_limite
+        self.continuo = False               # True enquanto o modo contínuo estiver ativo
+        self.periodo_continuo_ms = 0        # Período do modo contínuo temporizado (0 = back-to-back)
+        self._medicao_pendente = False      # Medição única disparada por tentar_ler()
+        self._proximo_resultado = 0.0       # Instante previsto do próximo resultado no modo contínuo
+        self.tempo_medicao = TEMPO_MEDICAO_PADRAO_MS / 1000.0  # Duração esperada de uma medição (s)
+        self.perfil = None
+        self.filtro = filtro                # Aplicado em toda leitura (ver sensores.filtros)
+        self._sequencia = None              # Cache de Sequencia (lida uma vez do sensor)
+        self._limite_sinal = None
 
-        # Gerencia o arquivo de configuração para salvar offset
-        self.config = Configuracao("calibracao_vl53l0x")
-        self.offset = self.config.obtem("offset") or 0  # Carrega offset salvo, se existir
+        # Arquivo de configuração do offset, aberto só quando o offset é usado
+        self._config = None
+        self._offset = None
 
         model_id = self._read_byte(0xC0)
         if model_id != 0xEE:
             raise Exception(f"VL53L0X não encontrado (ID lido: {hex(model_id)})")
+        self._configurar_interrupcao()
+
+        if perfil is not None:
+            self.definir_perfil(perfil)
+
+    # ----- CALIBRAÇÃO CARREGADA -----
+    @property
+    def config(self):
+        """Arquivo de calibração (cria/abre o .pkl no primeiro acesso)"""
+        if self._config is None:
+            self._config = Configuracao("calibracao_vl53l0x")
+        return self._config
+
+    @property
+    def offset(self):
+        """Offset de calibração em mm (carrega o salvo, se existir, no primeiro acesso)"""
+        if self._offset is None:
+            self._offset = self.config.obtem("offset") or 0
+        return self._offset
+
+    @offset.setter
+    def offset(self, valor):
+        self._offset = valor
 
     # ----- MÉTODOS I2C -----
     def _read_byte(self, reg):
-        return self.bus.read_byte_data(VL53L0X_ADDR, reg)
+        return self._ler_byte(reg)
 
     def _write_byte(self, reg, valor):
-        self.bus.write_byte_data(VL53L0X_ADDR, reg, valor)
+        self._escrever_byte(reg, valor)
+
+    def _configurar_interrupcao(self):
+        """
+        Aviso de "nova amostra pronta" em RESULT_INTERRUPT_STATUS (e no GPIO1, ativo
+        em nível baixo), como na inicialização da ST; sem isso os bits de status
+        podem nunca subir
+        """
+        self._write_byte(SYSTEM_INTERRUPT_CONFIG_GPIO, 0x04)
+        self._write_byte(GPIO_HV_MUX_ACTIVE_HIGH, self._read_byte(GPIO_HV_MUX_ACTIVE_HIGH) & ~0x10)
+        self._write_byte(SYSTEM_INTERRUPT_CLEAR, 0x01)
+
+    def _inicio_espera(self):
+        """Referência do tempo_limite: agora, ou daqui a um período no modo contínuo"""
+        return time.monotonic() + (self.periodo_amostragem() if self.continuo else 0.0)
+
+    def _verificar_tempo_limite(self, inicio):
+        """Levanta TimeoutError se já se passou tempo_limite desde `inicio` sem resultado"""
+        if self.tempo_limite and time.monotonic() - inicio > self.tempo_limite:
+            self._medicao_pendente = False
+            raise TimeoutError(f"VL53L0X no canal {self.canal_mux} sem resultado após "
+                               f"{self.tempo_limite} s além do tempo previsto.")
 
     def _read_word(self, reg):
-        high = self._read_byte(reg)
-        low = self._read_byte(reg + 1)
+        # Os dois bytes na mesma transação: nunca mistura metades de medições diferentes
+        high, low = self._ler_registradores(((reg, 2),))[0]
         return (high << 8) | low
 
+    # ----- PERFIS DE MEDIÇÃO -----
+    def _obter_sequencia(self):
+        """Lê etapas e timeouts da sequência de medição (só na primeira vez)"""
+        if self._sequencia is None:
+            (config,), (vcsel_pre, pre_hi, pre_lo), (msrc,), (vcsel_final, final_hi, final_lo) = \
+                self._ler_registradores(((SYSTEM_SEQUENCE_CONFIG, 1), (PRE_RANGE_CONFIG_VCSEL_PERIOD, 3),
+                                         (MSRC_CONFIG_TIMEOUT_MACROP, 1), (FINAL_RANGE_CONFIG_VCSEL_PERIOD, 3)))
+            self._sequencia = decodificar_sequencia(
+                config, vcsel_pre, msrc, pre_hi << 8 | pre_lo, vcsel_final, final_hi << 8 | final_lo)
+        return self._sequencia
+
+    def orcamento_medicao_us(self):
+        """Duração configurada de uma medição, em µs"""
+        return orcamento_us(self._obter_sequencia())
+
+    def definir_orcamento(self, orcamento):
+        """
+        Define o orçamento de tempo de uma medição (µs, mínimo 20000)
+        Uma única escrita: o timeout do final-range, que absorve o restante do orçamento.
+        """
+        if orcamento < ORCAMENTO_MINIMO_US:
+            raise ValueError(f"Orçamento mínimo do VL53L0X é {ORCAMENTO_MINIMO_US} µs.")
+        seq = self._obter_sequencia()
+        valor = timeout_final(seq, orcamento)
+        self._escrever_bloco(FINAL_RANGE_CONFIG_VCSEL_PERIOD + 1, valor.to_bytes(2, "big"))
+        final_mclks = _final_range_mclks(seq, valor)
+        self._sequencia = seq._replace(final_range_us=_mclks_para_us(final_mclks, seq.vcsel_final))
+        self.tempo_medicao = orcamento_us(self._sequencia) / 1e6
+
+    def definir_limite_sinal(self, mcps):
+        """Taxa de sinal mínima (MCPS) para aceitar uma medição; menor alcança mais longe"""
+        if mcps != self._limite_sinal:
+            self._escrever_bloco(FINAL_RANGE_MIN_COUNT_RATE_RTN_LIMIT, int(mcps * 128).to_bytes(2, "big"))
+            self._limite_sinal = mcps
+
+    def _definir_vcsel(self, periodo_pre, periodo_final):
+        """Troca os períodos do pulso do VCSEL, mantendo os timeouts em µs"""
+        seq = self._obter_sequencia()
+        if periodo_pre != seq.vcsel_pre:
+            self._escrever_bloco(PRE_RANGE_CONFIG_VALID_PHASE_LOW, [0x08, FASE_PRE_RANGE[periodo_pre]])
+            pre_mclks = _us_para_mclks(seq.pre_range_us, periodo_pre)
+            timeout = _codificar_timeout(pre_mclks)
+            # VCSEL_PERIOD e o timeout (0x51-0x52) são consecutivos: uma escrita só
+            self._escrever_bloco(PRE_RANGE_CONFIG_VCSEL_PERIOD, [(periodo_pre >> 1) - 1, timeout >> 8, timeout & 0xFF])
+            msrc = min(_us_para_mclks(seq.msrc_us, periodo_pre), 256)
+            self._write_byte(MSRC_CONFIG_TIMEOUT_MACROP, msrc - 1)
+            pre_mclks = _decodificar_timeout(timeout)
+            seq = seq._replace(vcsel_pre=periodo_pre, pre_range_mclks=pre_mclks,
+                               pre_range_us=_mclks_para_us(pre_mclks, periodo_pre),
+                               msrc_us=_mclks_para_us(msrc, periodo_pre))
+        if periodo_final != seq.vcsel_final:
+            fase, largura, phasecal, limite = FASE_FINAL_RANGE[periodo_final]
+            self._escrever_bloco(FINAL_RANGE_CONFIG_VALID_PHASE_LOW, [0x08, fase])
+            self._write_byte(GLOBAL_CONFIG_VCSEL_WIDTH, largura)
+            self._write_byte(ALGO_PHASECAL_CONFIG_TIMEOUT, phasecal)
+            self._write_byte(0xFF, 0x01)
+            self._write_byte(ALGO_PHASECAL_LIM, limite)
+            self._write_byte(0xFF, 0x00)
+            self._write_byte(FINAL_RANGE_CONFIG_VCSEL_PERIOD, (periodo_final >> 1) - 1)
+            seq = seq._replace(vcsel_final=periodo_final)
+        self._sequencia = seq   # O timeout final é reescrito por definir_orcamento
+
+    def _calibrar_referencia(self):
+        """Calibração de fase de referência, obrigatória após trocar o VCSEL"""
+        config = self._read_byte(SYSTEM_SEQUENCE_CONFIG)
+        self._write_byte(SYSTEM_SEQUENCE_CONFIG, 0x02)
+        self._write_byte(SYSRANGE_START, 0x01)
+        inicio = time.monotonic()
+        while (self._read_byte(RESULT_INTERRUPT_STATUS) & 0x07) == 0:
+            self._verificar_tempo_limite(inicio)
+            dormir(INTERVALO_POLL, "vl53l0x.poll")
+        self._write_byte(SYSTEM_INTERRUPT_CLEAR, 0x01)
+        self._write_byte(SYSRANGE_START, 0x00)
+        self._write_byte(SYSTEM_SEQUENCE_CONFIG, config)
+
+    def definir_perfil(self, nome):
+        """
+        Aplica um perfil de PERFIS (pode ser chamado a qualquer momento fora do modo contínuo)
+        Só escreve o que muda: entre perfis com o mesmo VCSEL, no máximo duas escritas.
+        """
+        if self.continuo:
+            raise RuntimeError("Pare o modo contínuo antes de trocar o perfil.")
+        perfil = PERFIS[nome]
+        seq = self._obter_sequencia()
+        troca_vcsel = (perfil.vcsel_pre, perfil.vcsel_final) != (seq.vcsel_pre, seq.vcsel_final)
+        if troca_vcsel:
+            self._definir_vcsel(perfil.vcsel_pre, perfil.vcsel_final)
+        self.definir_limite_sinal(perfil.limite_sinal_mcps)
+        seq = self._sequencia
+        atual = _us_para_mclks(seq.final_range_us, seq.vcsel_final)
+        if troca_vcsel or atual != _final_range_mclks(seq, timeout_final(seq, perfil.orcamento_us)):
+            self.definir_orcamento(perfil.orcamento_us)
+        else:
+            self.tempo_medicao = orcamento_us(seq) / 1e6
+        if troca_vcsel:
+            self._calibrar_referencia()
+        self.perfil = nome
+
+    # ----- MODO CONTÍNUO -----
+    def iniciar_continuo(self, periodo_ms=0):
+        """
+        Inicia a medição contínua do sensor
+        periodo_ms=0 -> back-to-back (uma medição logo após a outra)
+        periodo_ms>0 -> uma medição a cada periodo_ms
+        """
+        if periodo_ms:
+            periodo = int(periodo_ms)
+            osc = self._read_word(OSC_CALIBRATE_VAL)
+            if osc:
+                periodo *= osc  # O registrador conta ciclos do oscilador, não ms
+            self._escrever_bloco(SYSTEM_INTERMEASUREMENT_PERIOD, periodo.to_bytes(4, "big"))
+            self._write_byte(SYSRANGE_START, 0x04)  # Modo temporizado
+        else:
+            self._write_byte(SYSRANGE_START, 0x02)  # Modo back-to-back
+        self.continuo = True
+        self.periodo_continuo_ms = periodo_ms
+        self._medicao_pendente = False
+        self._proximo_resultado = time.monotonic() + self.periodo_amostragem()
+
+    def parar_continuo(self):
+        """Para a medição contínua e volta ao modo de medição única"""
+        self._write_byte(SYSRANGE_START, 0x01)
+        self._write_byte(SYSTEM_INTERRUPT_CLEAR, 0x01)
+        self.continuo = False
+
+    def _ler_resultado(self):
+        """
+        Lê o status da interrupção e a distância em uma única transação
+        Retorna a distância bruta (mm) ou None se a medição ainda não terminou.
+        """
+        (status,), (alto, baixo) = self._ler_registradores(
+            ((RESULT_INTERRUPT_STATUS, 1), (RESULT_RANGE_STATUS + 10, 2)))
+        return (alto << 8 | baixo) if status & 0x07 else None
+
+    def _coletar_resultado(self, distancia):
+        """Libera o sensor para o próximo resultado e aplica o offset e o filtro à distância lida"""
+        self._write_byte(SYSTEM_INTERRUPT_CLEAR, 0x01)
+        distancia += self.offset
+        if self.filtro is not None:
+            distancia = int(round(self.filtro.atualizar(distancia)))
+        return distancia
+
+    def tentar_ler(self):
+        """
+        Retorna a distância em mm (com offset) ou None se não houver resultado novo
+        Não bloqueia. Fora do modo contínuo, dispara uma medição única quando não
+        há nenhuma em andamento e a coleta numa chamada seguinte.
+        """
+        if not self.continuo and not self._medicao_pendente:
+            self._write_byte(SYSRANGE_START, 0x01)
+            self._medicao_pendente = True
+            return None
+        distancia = self._ler_resultado()
+        if distancia is None:
+            return None
+        self._medicao_pendente = False
+        return self._coletar_resultado(distancia)
+
     # ----- LEITURA DE DISTÂNCIA -----
     def ler_distancia(self):
-        """Lê a distância em mm, aplicando o offset de calibração"""
-        self._selecionar_canal_mux()
-        self._write_byte(0x00, 0x01)
+        """
+        Lê a distância em mm, aplicando o offset de calibração
+        Dorme uma vez pelo tempo esperado da medição (tempo_medicao, ou até o próximo
+        resultado no modo contínuo) e só consulta o sensor de novo se ainda não terminou.
+        Levanta TimeoutError se o resultado não vier em tempo_limite após o previsto.
+        """
+        if not self.continuo:
+            self._write_byte(SYSRANGE_START, 0x01)
+            self._medicao_pendente = False
+            esperado = time.monotonic() + self.tempo_medicao
+        else:
+            esperado = self._proximo_resultado
+        restante = esperado - time.monotonic()
+        if restante > 0:
+            dormir(restante, "vl53l0x.medicao")
 
-        while (self._read_byte(0x00) & 0x01) != 0:
-            time.sleep(0.01)
+        distancia = self._ler_resultado()
+        inicio = self._inicio_espera()
+        while distancia is None:
+            self._verificar_tempo_limite(inicio)
+            dormir(INTERVALO_POLL, "vl53l0x.poll")
+            esperado = time.monotonic()     # Terminou depois do previsto
+            distancia = self._ler_resultado()
+        distancia = self._coletar_resultado(distancia)
+        if self.continuo:
+            self._proximo_resultado = esperado + self.periodo_amostragem()
+        return distancia
 
-        distancia = self._read_word(0x14 + 10)
-        self._write_byte(0x0B, 0x01)
-        return distancia + self.offset
+    async def ler_distancia_async(self):
+        """
+        Versão assíncrona de ler_distancia: cede o laço do asyncio enquanto espera
+        Funciona tanto no modo de medição única quanto no contínuo.
+        """
+        distancia = self.tentar_ler()
+        if distancia is None and self._medicao_pendente:
+            await asyncio.sleep(self.tempo_medicao)     # Medição recém-disparada: espera ela inteira
+            distancia = self.tentar_ler()
+        inicio = self._inicio_espera()
+        while distancia is None:
+            self._verificar_tempo_limite(inicio)
+            await asyncio.sleep(INTERVALO_POLL)
+            distancia = self.tentar_ler()
+        return distancia
+
+    # ----- AMOSTRAGEM -----
+    def periodo_amostragem(self):
+        """Intervalo entre medições: o período do modo contínuo ou o tempo de uma medição"""
+        return max(self.periodo_continuo_ms / 1000.0, self.tempo_medicao)
+
+    def _ler_amostra(self, destino):
+        destino[0] = self.ler_distancia()
+
+    def _disparar_amostra(self):
+        if not self.continuo:
+            self._write_byte(SYSRANGE_START, 0x01)
+            self._medicao_pendente = True
+
+    def _coletar_amostra(self, destino):
+        distancia = self._ler_resultado()
+        if distancia is None:
+            return False
+        self._medicao_pendente = False
+        destino[0] = self._coletar_resultado(distancia)
+        return True
 
     # ----- CALIBRAÇÃO -----
-    def calibrar(self, distancia_real_mm, amostras=100):
-        """Calibra o sensor para uma distância real conhecida e salva o offset"""
+    def calibrar(self, distancia_real_mm, amostras=100, tolerancia=1.0):
+        """
+        Calibra o sensor para uma distância real conhecida e salva o offset
+        amostras   -> máximo de leituras
+        tolerancia -> para quando o intervalo de confiança (95%) da média estiver
+                      dentro de ±tolerancia mm; leituras espúrias são descartadas
+        Salva também a variância das leituras ("variancia"), útil para filtros.
+        """
         print(f"Coloque um objeto a {distancia_real_mm} mm do sensor.")
         input("Pressione ENTER para iniciar a calibração...")
 
-        valores = []
-        for _ in range(amostras):
-            dist = self.ler_distancia() - self.offset
-            valores.append(dist)
-            time.sleep(0.02)
-
-        media = sum(valores) / len(valores)
-        self.offset = int(distancia_real_mm - media)
+        filtro, self.filtro = self.filtro, None   # Calibra com as leituras cruas
+        try:
+            offset = self.offset
+            estatistica = medir_ate_estabilizar(lambda: self.ler_distancia() - offset,
+                                                amostras, tolerancia=tolerancia)
+        finally:
+            self.filtro = filtro
 
-        # Salva o novo offset no arquivo de configuração
-        self.config.insere("offset", self.offset)
-        print(f"Calibração concluída. Offset salvo: {self.offset} mm")
+        media = float(estatistica.media[0])
+        variancia = float(estatistica.variancia[0])
+        self.offset = int(round(distancia_real_mm - media))
 
-    def close(self):
-        self.bus.close()
+        # Salva o novo offset e a variância no arquivo de configuração
+        with self.config.lote():
+            self.config.insere("offset", self.offset)
+            self.config.insere("variancia", variancia)
+        print(f"Calibração concluída. Offset salvo: {self.offset} mm "
+              f"({estatistica.n} leituras, {estatistica.rejeitadas} descartadas, "
+              f"desvio {variancia ** 0.5:.1f} mm, IC 95% ±{estatistica.meia_largura()[0]:.1f} mm)")
 
 
 # # ===== TESTE =====